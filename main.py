@@ -8,13 +8,17 @@ and logging configuration.
 
 import asyncio
 import sys
-from pathlib import Path
 
-# Add src to Python path
-src_path = Path(__file__).parent / "src"
-sys.path.insert(0, str(src_path))
-
-from telegram_ai_bot.core.application import main
+try:
+    from telegram_ai_bot.core.application import main
+except ModuleNotFoundError as e:
+    if e.name != "telegram_ai_bot":
+        raise
+    # Running from a source checkout without `pip install -e .`
+    import site
+    from pathlib import Path
+    site.addsitedir(str(Path(__file__).parent / "src"))
+    from telegram_ai_bot.core.application import main
 
 
 if __name__ == "__main__":
@@ -4,11 +4,15 @@ Management interface for the professional Telegram AI Bot.
 Provides status monitoring, logs viewing, and basic controls.
 """
 
+import json
 import os
 import subprocess
 import signal
+import sys
+import time
+from datetime import datetime, timezone
 from pathlib import Path
-from flask import Flask, jsonify, request
+from flask import Flask, Response, jsonify, request
 from flask_cors import CORS
 import logging
 
@@ -23,105 +27,212 @@ CORS(app)
 BOT_DIR = Path(__file__).parent
 BOT_SCRIPT = BOT_DIR / "main.py"
 BOT_LOG = BOT_DIR / "bot.log"
+BOT_LOG_PATH = str(BOT_LOG)
+BOT_DIR_PATH = str(BOT_DIR)
 MANAGEMENT_LOG = BOT_DIR / "management.log"
+LOG_READ_BLOCK = 65536  # 64KB blocks when reading the log backwards
+MAX_LOG_LINES = 1000
+PID_CACHE_TTL = 1.0  # seconds
+STATE_POLL_INTERVAL = 0.05  # seconds between checks while starting/stopping
+START_GRACE_PERIOD = 2.0  # seconds a new bot must stay up to count as started
+PYTHON_VERSION = f"Python {sys.version.split()[0]}"
+
+_pid_cache = {"pid": None, "ts": 0.0}
+
+# Bot process started by this management server, if any
+BOT_PROCESS = None
+
+# Static parts of the / and /health responses, serialized once at import
+SERVICE_INFO = {
+    "service": "Telegram AI Bot Management",
+    "version": "2.0.0-professional",
+    "architecture": "enterprise-grade",
+    "features": [
+        "OpenAI Assistant API Integration",
+        "11 Character Personalities",
+        "Professional Architecture",
+        "Comprehensive Testing",
+        "Type Safety",
+        "Production Ready"
+    ]
+}
+_INDEX_JSON_TAIL = json.dumps(SERVICE_INFO, separators=(',', ':'))[1:].encode()
+_HEALTH_JSON_HEAD = b'{"service":"telegram-ai-bot-management","status":"healthy","timestamp":"'
+
+def tail_file(path, n, block=LOG_READ_BLOCK):
+    """Return the last n lines of a file without reading all of it.
+    
+    Reads fixed-size blocks backwards from the end of the file until
+    enough newlines have been seen.
+    """
+    if n <= 0:
+        return []
+    
+    with open(path, 'rb') as f:
+        f.seek(0, os.SEEK_END)
+        size = f.tell()
+        buf = b''
+        pos = size
+        
+        # One extra newline is needed since the last line usually ends with one
+        while pos > 0 and buf.count(b'\n') <= n:
+            read_size = min(block, pos)
+            pos -= read_size
+            f.seek(pos)
+            buf = f.read(read_size) + buf
+    
+    # Split the raw bytes and decode only the lines being returned
+    return [line.decode('utf-8', errors='replace') for line in buf.splitlines()[-n:]]
+
+def _find_bot_pid():
+    """Scan /proc for a process whose command line mentions the bot script."""
+    own_pid = os.getpid()
+    pids = []
+    for entry in os.scandir('/proc'):
+        if not entry.name.isdigit():
+            continue
+        pid = int(entry.name)
+        if pid == own_pid:
+            continue
+        try:
+            with open(f'/proc/{pid}/cmdline', 'rb') as f:
+                cmdline = f.read()
+        except OSError:
+            # Process exited or is not readable
+            continue
+        if any(b'main.py' in arg for arg in cmdline.split(b'\0')):
+            pids.append(pid)
+    return min(pids) if pids else None
 
 def get_bot_pid():
-    """Get the PID of the running bot process."""
+    """Get the PID of the running bot process.
+    
+    A bot started by this server is tracked directly. Otherwise the process
+    table is scanned, with the result cached for PID_CACHE_TTL seconds so
+    that bursts of dashboard requests only scan it once.
+    """
+    global BOT_PROCESS
+    if BOT_PROCESS is not None:
+        if BOT_PROCESS.poll() is None:
+            return BOT_PROCESS.pid
+        # Our child has exited; fall back to discovering other instances
+        BOT_PROCESS = None
+        invalidate_pid_cache()
+    
+    now = time.monotonic()
+    if now - _pid_cache["ts"] < PID_CACHE_TTL:
+        return _pid_cache["pid"]
+    
     try:
-        result = subprocess.run(
-            ["pgrep", "-f", "main.py"],
-            capture_output=True,
-            text=True
-        )
-        if result.returncode == 0 and result.stdout.strip():
-            return int(result.stdout.strip().split('\n')[0])
-        return None
+        pid = _find_bot_pid()
     except Exception as e:
         logger.error(f"Error getting bot PID: {e}")
         return None
+    
+    _pid_cache["pid"] = pid
+    _pid_cache["ts"] = now
+    return pid
+
+def invalidate_pid_cache():
+    """Force the next get_bot_pid() call to rescan the process table."""
+    _pid_cache["ts"] = 0.0
+
+def log_stat():
+    """Return (exists, size) for the bot log using a single stat call."""
+    try:
+        return True, os.stat(BOT_LOG_PATH).st_size
+    except FileNotFoundError:
+        return False, 0
 
 def is_bot_running():
     """Check if the bot is currently running."""
     return get_bot_pid() is not None
 
+def wait_for_bot_state(running, timeout):
+    """Poll until the bot is (or is not) running, up to timeout seconds.
+    
+    Returns True if the requested state was reached in time.
+    """
+    deadline = time.monotonic() + timeout
+    while True:
+        invalidate_pid_cache()
+        if is_bot_running() == running:
+            return True
+        if time.monotonic() >= deadline:
+            return False
+        time.sleep(STATE_POLL_INTERVAL)
+
+def wait_for_early_exit(process, grace_period):
+    """Watch a just-started process for up to grace_period seconds.
+    
+    Returns its exit code if it exited in that time, otherwise None.
+    """
+    deadline = time.monotonic() + grace_period
+    while True:
+        exit_code = process.poll()
+        if exit_code is not None or time.monotonic() >= deadline:
+            return exit_code
+        time.sleep(STATE_POLL_INTERVAL)
+
 @app.route('/')
 def index():
     """Main status page."""
-    bot_running = is_bot_running()
-    bot_pid = get_bot_pid() if bot_running else None
+    bot_pid = get_bot_pid()
     
-    return jsonify({
-        "service": "Telegram AI Bot Management",
-        "status": "running" if bot_running else "stopped",
-        "bot_pid": bot_pid,
-        "version": "2.0.0-professional",
-        "architecture": "enterprise-grade",
-        "features": [
-            "OpenAI Assistant API Integration",
-            "11 Character Personalities",
-            "Professional Architecture",
-            "Comprehensive Testing",
-            "Type Safety",
-            "Production Ready"
-        ]
-    })
+    if bot_pid is not None:
+        dynamic = b'{"status":"running","bot_pid":' + str(bot_pid).encode() + b','
+    else:
+        dynamic = b'{"status":"stopped","bot_pid":null,'
+    
+    return Response(dynamic + _INDEX_JSON_TAIL, mimetype='application/json')
 
 @app.route('/status')
 def status():
     """Get detailed bot status."""
-    bot_running = is_bot_running()
-    bot_pid = get_bot_pid() if bot_running else None
-    
-    # Get log file size
-    log_size = 0
-    if BOT_LOG.exists():
-        log_size = BOT_LOG.stat().st_size
+    bot_pid = get_bot_pid()
+    log_exists, log_size = log_stat()
     
     return jsonify({
-        "bot_running": bot_running,
+        "bot_running": bot_pid is not None,
         "bot_pid": bot_pid,
         "log_file_size": log_size,
-        "log_file_exists": BOT_LOG.exists(),
-        "project_directory": str(BOT_DIR),
-        "python_version": subprocess.run(
-            ["python3", "--version"], 
-            capture_output=True, 
-            text=True
-        ).stdout.strip()
+        "log_file_exists": log_exists,
+        "project_directory": BOT_DIR_PATH,
+        "python_version": PYTHON_VERSION
     })
 
 @app.route('/logs')
 def logs():
     """Get bot logs."""
     lines = request.args.get('lines', 50, type=int)
-    lines = min(lines, 1000)  # Limit to 1000 lines max
+    if lines <= 0 or lines > MAX_LOG_LINES:
+        return jsonify({
+            "error": f"lines must be between 1 and {MAX_LOG_LINES}",
+            "logs": []
+        }), 400
     
-    if not BOT_LOG.exists():
+    log_exists, log_size = log_stat()
+    if not log_exists:
         return jsonify({"error": "Log file not found", "logs": []})
     
     try:
-        result = subprocess.run(
-            ["tail", f"-{lines}", str(BOT_LOG)],
-            capture_output=True,
-            text=True
-        )
-        
-        if result.returncode == 0:
-            log_lines = result.stdout.strip().split('\n') if result.stdout.strip() else []
-            return jsonify({
-                "logs": log_lines,
-                "lines_requested": lines,
-                "lines_returned": len(log_lines)
-            })
+        if log_size == 0:
+            log_lines = []
         else:
-            return jsonify({"error": "Failed to read logs", "logs": []})
-            
+            log_lines = tail_file(BOT_LOG_PATH, lines)
+        return jsonify({
+            "logs": log_lines,
+            "lines_requested": lines,
+            "lines_returned": len(log_lines)
+        })
     except Exception as e:
         return jsonify({"error": f"Error reading logs: {str(e)}", "logs": []})
 
 @app.route('/start', methods=['POST'])
 def start_bot():
     """Start the bot."""
+    global BOT_PROCESS
+    
     if is_bot_running():
         return jsonify({
             "success": False,
@@ -130,29 +241,33 @@ def start_bot():
         })
     
     try:
-        # Start bot in background
-        process = subprocess.Popen(
-            ["nohup", "python3", str(BOT_SCRIPT)],
-            stdout=open(BOT_LOG, 'a'),
-            stderr=subprocess.STDOUT,
-            cwd=BOT_DIR,
-            preexec_fn=os.setsid
-        )
+        # Start bot in background. The child gets its own copy of the log
+        # descriptor, so ours is closed right away. Python output is
+        # unbuffered so /logs sees new lines as soon as they are printed.
+        with open(BOT_LOG_PATH, 'ab', buffering=0) as log_file:
+            BOT_PROCESS = subprocess.Popen(
+                [sys.executable, str(BOT_SCRIPT)],
+                stdout=log_file,
+                stderr=subprocess.STDOUT,
+                cwd=BOT_DIR,
+                env={**os.environ, "PYTHONUNBUFFERED": "1"},
+                start_new_session=True,
+                close_fds=True
+            )
         
-        # Give it a moment to start
-        import time
-        time.sleep(2)
-        
-        if is_bot_running():
+        # A bot that crashes on startup exits within the grace period
+        exit_code = wait_for_early_exit(BOT_PROCESS, START_GRACE_PERIOD)
+        if exit_code is None:
             return jsonify({
                 "success": True,
                 "message": "Bot started successfully",
-                "pid": get_bot_pid()
+                "pid": BOT_PROCESS.pid
             })
         else:
+            invalidate_pid_cache()
             return jsonify({
                 "success": False,
-                "message": "Bot failed to start - check logs"
+                "message": f"Bot failed to start (exit code {exit_code}) - check logs"
             })
             
     except Exception as e:
@@ -176,17 +291,15 @@ def stop_bot():
         # Send SIGTERM first
         os.kill(bot_pid, signal.SIGTERM)
         
-        # Give it time to shutdown gracefully
-        import time
-        time.sleep(3)
+        # Give it up to 3 seconds to shutdown gracefully
+        stopped = wait_for_bot_state(running=False, timeout=3)
         
-        # Check if still running
-        if is_bot_running():
+        if not stopped:
             # Force kill if still running
             os.kill(bot_pid, signal.SIGKILL)
-            time.sleep(1)
+            stopped = wait_for_bot_state(running=False, timeout=1)
         
-        if not is_bot_running():
+        if stopped:
             return jsonify({
                 "success": True,
                 "message": f"Bot stopped successfully (PID: {bot_pid})"
@@ -217,10 +330,6 @@ def restart_bot():
                 "message": "Failed to stop bot for restart"
             })
     
-    # Wait a moment
-    import time
-    time.sleep(2)
-    
     # Start again
     start_result = start_bot()
     
@@ -239,15 +348,11 @@ def restart_bot():
 @app.route('/health')
 def health():
     """Health check endpoint."""
-    return jsonify({
-        "status": "healthy",
-        "service": "telegram-ai-bot-management",
-        "timestamp": subprocess.run(
-            ["date", "-Iseconds"], 
-            capture_output=True, 
-            text=True
-        ).stdout.strip()
-    })
+    timestamp = datetime.now(timezone.utc).astimezone().isoformat(timespec='seconds')
+    return Response(
+        _HEALTH_JSON_HEAD + timestamp.encode() + b'"}',
+        mimetype='application/json'
+    )
 
 if __name__ == '__main__':
     logger.info("Starting Telegram AI Bot Management Interface...")
@@ -255,6 +360,13 @@ if __name__ == '__main__':
     logger.info(f"Bot script: {BOT_SCRIPT}")
     logger.info(f"Bot log: {BOT_LOG}")
     
-    # Run Flask app
-    app.run(host='0.0.0.0', port=8080, debug=False)
+    # Run Flask app with a threaded WSGI server so slow requests
+    # (start/stop, log reads) don't block health checks
+    try:
+        from waitress import serve
+    except ImportError:
+        logger.warning("waitress not installed, falling back to Flask development server")
+        app.run(host='0.0.0.0', port=8080, debug=False, threaded=True)
+    else:
+        serve(app, host='0.0.0.0', port=8080, threads=8)
 
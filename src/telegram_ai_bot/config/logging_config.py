@@ -1,10 +1,16 @@
 """Logging configuration for the application."""
 
+import atexit
 import logging
 import logging.config
+import queue
 import sys
+from logging.handlers import QueueHandler, QueueListener
 from pathlib import Path
-from typing import Dict, Any
+from typing import Dict, Any, Optional
+
+# Background listener that writes application log records to their handlers
+_queue_listener: Optional[QueueListener] = None
 
 
 def setup_logging(
@@ -31,6 +37,10 @@ def setup_logging(
         "version": 1,
         "disable_existing_loggers": False,
         "formatters": {
+            "standard": {
+                "format": "%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+                "datefmt": "%Y-%m-%d %H:%M:%S"
+            },
             "detailed": {
                 "format": "%(asctime)s - %(name)s - %(levelname)s - %(funcName)s:%(lineno)d - %(message)s",
                 "datefmt": "%Y-%m-%d %H:%M:%S"
@@ -47,13 +57,22 @@ def setup_logging(
             "console": {
                 "class": "logging.StreamHandler",
                 "level": log_level,
-                "formatter": "detailed",
+                "formatter": "standard",
                 "stream": sys.stdout
             },
             "file": {
+                # Buffer records and write them in batches; ERROR and above
+                # flush immediately. Pending records are flushed on shutdown.
+                "class": "logging.handlers.MemoryHandler",
+                "level": log_level,
+                "capacity": 1024,
+                "flushLevel": logging.ERROR,
+                "target": "file_target"
+            },
+            "file_target": {
                 "class": "logging.handlers.RotatingFileHandler",
                 "level": log_level,
-                "formatter": "detailed",
+                "formatter": "standard",
                 "filename": str(log_file_path),
                 "maxBytes": 10485760,  # 10MB
                 "backupCount": 5,
@@ -98,6 +117,44 @@ def setup_logging(
     }
     
     logging.config.dictConfig(config)
+    _start_queue_listener(logging.getLogger("telegram_ai_bot"))
+
+
+def _start_queue_listener(logger: logging.Logger) -> None:
+    """Move a logger's handlers behind a queue serviced by a background thread.
+    
+    Formatting and file writes then happen off the thread that emits the
+    record, so logging on the message handling path does not block on I/O.
+    
+    Args:
+        logger: Logger whose handlers should be queued
+    """
+    global _queue_listener
+    
+    if _queue_listener is not None:
+        _queue_listener.stop()
+    
+    handlers = logger.handlers[:]
+    for handler in handlers:
+        logger.removeHandler(handler)
+    
+    log_queue: "queue.Queue[logging.LogRecord]" = queue.Queue(-1)
+    logger.addHandler(QueueHandler(log_queue))
+    
+    _queue_listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _queue_listener.start()
+
+
+def _stop_queue_listener() -> None:
+    """Flush queued log records and stop the background listener."""
+    global _queue_listener
+    
+    if _queue_listener is not None:
+        _queue_listener.stop()
+        _queue_listener = None
+
+
+atexit.register(_stop_queue_listener)
 
 
 def get_logger(name: str) -> logging.Logger:
@@ -1,60 +1,138 @@
 """Application settings and configuration management."""
 
 import os
-from typing import Optional
-from pydantic import Field
-from pydantic_settings import BaseSettings
-from functools import lru_cache
+from dataclasses import dataclass, field
+from typing import Optional, overload
+from dotenv import load_dotenv
 
 
-class Settings(BaseSettings):
-    """Application settings with validation and environment variable support."""
+def _getenv(name: str) -> Optional[str]:
+    """Look up an environment variable, ignoring the case of its name.
     
+    An exact match wins; otherwise any variable whose name matches
+    case-insensitively is used.
+    """
+    value = os.environ.get(name)
+    if value is None:
+        lower = name.lower()
+        value = next((v for k, v in os.environ.items() if k.lower() == lower), None)
+    return value
+
+
+@overload
+def _env_str(name: str) -> Optional[str]: ...
+
+
+@overload
+def _env_str(name: str, default: str) -> str: ...
+
+
+def _env_str(name: str, default: Optional[str] = None) -> Optional[str]:
+    """Read a string environment variable."""
+    value = _getenv(name)
+    return value if value is not None else default
+
+
+def _env_required(name: str) -> str:
+    """Read an environment variable that must be set."""
+    value = _getenv(name)
+    if value is None:
+        raise ValueError(f"{name} environment variable is required")
+    return value
+
+
+def _env_int(name: str, default: int) -> int:
+    """Read an integer environment variable."""
+    value = _getenv(name)
+    return int(value) if value is not None else default
+
+
+def _env_float(name: str, default: float) -> float:
+    """Read a float environment variable."""
+    value = _getenv(name)
+    return float(value) if value is not None else default
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    """Read a boolean environment variable."""
+    value = _getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+@dataclass(frozen=True)
+class Settings:
+    """Application settings loaded once from environment variables.
+
+    Values are read from the process environment, falling back to a `.env`
+    file loaded by `get_settings()`. Instances are immutable.
+    """
+
     # Telegram Configuration
-    telegram_bot_token: str = Field(..., env="TELEGRAM_BOT_TOKEN")
-    telegram_webhook_url: Optional[str] = Field(None, env="TELEGRAM_WEBHOOK_URL")
-    
+    telegram_bot_token: str = field(default_factory=lambda: _env_required("TELEGRAM_BOT_TOKEN"))
+    telegram_webhook_url: Optional[str] = field(default_factory=lambda: _env_str("TELEGRAM_WEBHOOK_URL"))
+
     # OpenAI Configuration
-    openai_api_key: str = Field(..., env="OPENAI_API_KEY")
-    openai_model: str = Field("gpt-3.5-turbo", env="OPENAI_MODEL")
-    openai_max_tokens: int = Field(300, env="OPENAI_MAX_TOKENS")
-    openai_temperature: float = Field(0.8, env="OPENAI_TEMPERATURE")
-    
+    openai_api_key: str = field(default_factory=lambda: _env_required("OPENAI_API_KEY"))
+    openai_model: str = field(default_factory=lambda: _env_str("OPENAI_MODEL", "gpt-3.5-turbo"))
+    openai_max_tokens: int = field(default_factory=lambda: _env_int("OPENAI_MAX_TOKENS", 300))
+    openai_temperature: float = field(default_factory=lambda: _env_float("OPENAI_TEMPERATURE", 0.8))
+    # Client-side limits on OpenAI calls; 0 disables the per-minute limits
+    openai_max_concurrency: int = field(default_factory=lambda: _env_int("OPENAI_MAX_CONCURRENCY", 10))
+    openai_requests_per_minute: int = field(
+        default_factory=lambda: _env_int("OPENAI_REQUESTS_PER_MINUTE", 500)
+    )
+    openai_tokens_per_minute: int = field(
+        default_factory=lambda: _env_int("OPENAI_TOKENS_PER_MINUTE", 0)
+    )
+
     # Bot Configuration
-    bot_name: str = Field("AI Bot", env="BOT_NAME")
-    bot_username: str = Field("@ai_bot", env="BOT_USERNAME")
-    bot_description: str = Field("AI-powered Telegram bot", env="BOT_DESCRIPTION")
-    
+    bot_name: str = field(default_factory=lambda: _env_str("BOT_NAME", "AI Bot"))
+    bot_username: str = field(default_factory=lambda: _env_str("BOT_USERNAME", "@ai_bot"))
+    bot_description: str = field(
+        default_factory=lambda: _env_str("BOT_DESCRIPTION", "AI-powered Telegram bot")
+    )
+
     # Application Configuration
-    debug: bool = Field(False, env="DEBUG")
-    log_level: str = Field("INFO", env="LOG_LEVEL")
-    environment: str = Field("production", env="ENVIRONMENT")
-    
+    debug: bool = field(default_factory=lambda: _env_bool("DEBUG", False))
+    log_level: str = field(default_factory=lambda: _env_str("LOG_LEVEL", "INFO"))
+    environment: str = field(default_factory=lambda: _env_str("ENVIRONMENT", "production"))
+
     # Database Configuration (for future use)
-    database_url: Optional[str] = Field(None, env="DATABASE_URL")
-    
+    database_url: Optional[str] = field(default_factory=lambda: _env_str("DATABASE_URL"))
+
     # Web Management Configuration
-    web_host: str = Field("0.0.0.0", env="WEB_HOST")
-    web_port: int = Field(8080, env="WEB_PORT")
-    web_enabled: bool = Field(True, env="WEB_ENABLED")
-    
+    web_host: str = field(default_factory=lambda: _env_str("WEB_HOST", "0.0.0.0"))
+    web_port: int = field(default_factory=lambda: _env_int("WEB_PORT", 8080))
+    web_enabled: bool = field(default_factory=lambda: _env_bool("WEB_ENABLED", True))
+
     # Session Configuration
-    session_timeout: int = Field(3600, env="SESSION_TIMEOUT")  # 1 hour
-    max_conversation_history: int = Field(20, env="MAX_CONVERSATION_HISTORY")
-    
+    session_timeout: int = field(default_factory=lambda: _env_int("SESSION_TIMEOUT", 3600))  # 1 hour
+    max_conversation_history: int = field(
+        default_factory=lambda: _env_int("MAX_CONVERSATION_HISTORY", 20)
+    )
+
     # Assistant API Configuration
-    assistant_timeout: int = Field(30, env="ASSISTANT_TIMEOUT")
-    max_retries: int = Field(3, env="MAX_RETRIES")
-    
-    class Config:
-        """Pydantic configuration."""
-        env_file = ".env"
-        env_file_encoding = "utf-8"
-        case_sensitive = False
+    assistant_timeout: int = field(default_factory=lambda: _env_int("ASSISTANT_TIMEOUT", 30))
+    max_retries: int = field(default_factory=lambda: _env_int("MAX_RETRIES", 3))
+    # Created assistants, kept across restarts ("" disables persistence)
+    assistant_cache_file: str = field(
+        default_factory=lambda: _env_str("ASSISTANT_CACHE_FILE", "data/assistants.json")
+    )
+
+
+_settings: Optional[Settings] = None
 
 
-@lru_cache()
 def get_settings() -> Settings:
-    """Get cached application settings."""
-    return Settings()
+    """Get cached application settings.
 
+    Settings are loaded from the environment (and `.env`, if present) on
+    first use only; later calls return the same instance.
+    """
+    global _settings
+    if _settings is None:
+        load_dotenv(".env", encoding="utf-8")
+        _settings = Settings()
+    return _settings
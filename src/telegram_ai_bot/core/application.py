@@ -88,22 +88,31 @@ class Application:
     
     def _setup_signal_handlers(self) -> None:
         """Setup signal handlers for graceful shutdown."""
-        def signal_handler(signum, frame):
-            logger.info(f"Received signal {signum}")
-            asyncio.create_task(self._trigger_shutdown())
-        
-        # Setup signal handlers
-        signal.signal(signal.SIGINT, signal_handler)
-        signal.signal(signal.SIGTERM, signal_handler)
+        loop = asyncio.get_running_loop()
         
+        signals = [signal.SIGINT, signal.SIGTERM]
         if sys.platform != "win32":
-            signal.signal(signal.SIGHUP, signal_handler)
+            signals.append(signal.SIGHUP)
+        
+        for sig in signals:
+            try:
+                loop.add_signal_handler(sig, self._handle_signal, sig)
+            except NotImplementedError:
+                # Event loop signal handlers are unavailable on Windows
+                signal.signal(
+                    sig,
+                    lambda signum, frame: loop.call_soon_threadsafe(self._handle_signal, signum)
+                )
         
         logger.info("Signal handlers setup completed")
     
-    async def _trigger_shutdown(self) -> None:
-        """Trigger application shutdown."""
-        logger.info("Triggering application shutdown...")
+    def _handle_signal(self, signum: int) -> None:
+        """Trigger application shutdown on a signal.
+        
+        Args:
+            signum: Received signal number
+        """
+        logger.info(f"Received signal {signum}, triggering application shutdown...")
         self._shutdown_event.set()
 
 
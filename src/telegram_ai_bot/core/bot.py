@@ -1,6 +1,5 @@
 """Core Telegram bot implementation."""
 
-import asyncio
 from typing import Optional
 from telegram.ext import Application, CommandHandler, MessageHandler, CallbackQueryHandler, filters
 
@@ -20,6 +19,16 @@ logger = get_logger(__name__)
 class TelegramAIBot:
     """Main Telegram AI Bot class."""
     
+    # Bot commands and the CommandHandler methods that serve them
+    COMMANDS = (
+        ("start", "start_command"),
+        ("characters", "characters_command"),
+        ("startover", "startover_command"),
+        ("photo", "photo_command"),
+        ("status", "status_command"),
+        ("help", "help_command"),
+    )
+    
     def __init__(self, settings: Settings):
         """Initialize the bot.
         
@@ -60,21 +69,17 @@ class TelegramAIBot:
         # Create application
         self.application = Application.builder().token(self.settings.telegram_bot_token).build()
         
-        # Add command handlers
-        self.application.add_handler(CommandHandler("start", self.command_handler.start_command))
-        self.application.add_handler(CommandHandler("characters", self.command_handler.characters_command))
-        self.application.add_handler(CommandHandler("startover", self.command_handler.startover_command))
-        self.application.add_handler(CommandHandler("photo", self.command_handler.photo_command))
-        self.application.add_handler(CommandHandler("status", self.command_handler.status_command))
-        self.application.add_handler(CommandHandler("help", self.command_handler.help_command))
-        
-        # Add callback handler
-        self.application.add_handler(CallbackQueryHandler(self.callback_handler.handle_callback))
-        
-        # Add message handler (for non-command messages)
-        self.application.add_handler(
+        # Register all handlers in one batch
+        handlers = [
+            CommandHandler(command, getattr(self.command_handler, method_name))
+            for command, method_name in self.COMMANDS
+        ]
+        handlers.append(CallbackQueryHandler(self.callback_handler.handle_callback))
+        # Message handler for non-command messages
+        handlers.append(
             MessageHandler(filters.TEXT & ~filters.COMMAND, self.message_handler.handle_message)
         )
+        self.application.add_handlers(handlers)
         
         # Initialize application
         await self.application.initialize()
@@ -115,25 +120,11 @@ class TelegramAIBot:
         # Shutdown
         await self.application.shutdown()
         
+        # Release pooled OpenAI connections
+        await self.assistant_service.close()
+        
         logger.info("Bot stopped")
     
-    async def run(self) -> None:
-        """Run the bot until interrupted."""
-        try:
-            await self.start()
-            
-            # Keep running until interrupted
-            while True:
-                await asyncio.sleep(1)
-                
-        except KeyboardInterrupt:
-            logger.info("Received keyboard interrupt")
-        except Exception as e:
-            logger.error(f"Bot error: {e}")
-            raise
-        finally:
-            await self.stop()
-    
     def get_stats(self) -> dict:
         """Get bot statistics.
         
@@ -144,12 +135,12 @@ class TelegramAIBot:
             "active_sessions": self.conversation_service.get_active_sessions_count(),
             "total_conversations": self.conversation_service.get_total_conversations_count(),
             "total_users": self.user_service.get_user_count(),
-            "available_characters": len(self.character_service.get_all_characters())
+            "available_characters": len(self.character_service.characters)
         }
     
     async def cleanup(self) -> None:
         """Perform cleanup operations."""
-        logger.info("Performing bot cleanup...")
+        logger.debug("Performing bot cleanup...")
         
         # Cleanup expired sessions
         expired_sessions = self.conversation_service.cleanup_expired_sessions(
@@ -164,5 +155,5 @@ class TelegramAIBot:
         # if deleted_assistants > 0:
         #     logger.info(f"Cleaned up {deleted_assistants} assistants")
         
-        logger.info("Cleanup completed")
+        logger.debug("Cleanup completed")
 
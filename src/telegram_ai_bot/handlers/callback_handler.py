@@ -53,11 +53,11 @@ class CallbackHandler:
             if callback_data.startswith("select_character:"):
                 await self._handle_character_selection(query, callback_data)
             else:
-                logger.warning(f"Unknown callback data: {callback_data}")
+                logger.warning("Unknown callback data: %s", callback_data)
                 await query.answer("Unknown action")
         
         except Exception as e:
-            logger.error(f"Error handling callback {callback_data}: {e}")
+            logger.error("Error handling callback %s: %s", callback_data, e)
             await query.answer("An error occurred. Please try again.")
     
     async def _handle_character_selection(self, query, callback_data: str) -> None:
@@ -72,7 +72,7 @@ class CallbackHandler:
         user = query.from_user
         
         # Get character
-        character = self.character_service.get_character(character_id)
+        character = self.character_service.characters.get(character_id)
         if not character:
             await query.answer("Character not found")
             return
@@ -83,19 +83,16 @@ class CallbackHandler:
             
             # Update the message
             await query.edit_message_text(
-                f"✅ **Character Selected: {character.emoji} {character.name}**\\n\\n"
-                f"{character.description}\\n\\n"
-                f"💬 {character.greeting}\\n\\n"
-                f"You can now start chatting! I'll respond as {character.name}.",
-                parse_mode='Markdown'
+                self.character_service.get_selection_message(character),
+                parse_mode='MarkdownV2'
             )
             
             await query.answer(f"Selected {character.name}")
             
-            logger.info(f"User {user.id} selected character {character.id} ({character.name})")
+            logger.info("User %s selected character %s (%s)", user.id, character.id, character.name)
             
         except Exception as e:
-            logger.error(f"Failed to set character {character_id} for user {user.id}: {e}")
+            logger.error("Failed to set character %s for user %s: %s", character_id, user.id, e)
             await query.answer("Failed to select character. Please try again.")
             await query.edit_message_text(
                 "❌ Failed to select character. Please try /characters again."
@@ -1,5 +1,7 @@
 """Command handlers for Telegram bot."""
 
+from typing import Optional, Tuple
+
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ContextTypes
 
@@ -10,6 +12,54 @@ from ..services.user_service import UserService
 
 logger = get_logger(__name__)
 
+HELP_TEXT = """
+🤖 **AI Bot Help**
+
+**Commands:**
+/start - Start the bot and select a character
+/characters - Show character selection menu
+/photo - Get a photo of your current character
+/startover - Reset conversation and start fresh
+/status - Show your current status
+/help - Show this help message
+
+**How to use:**
+1. Use /start to begin
+2. Select a character from the menu
+3. Start chatting! The AI will respond as your chosen character
+4. Use /startover to reset your conversation anytime
+5. Use /characters to switch to a different character
+
+**Features:**
+✨ Real AI conversations with unique personalities
+🎭 Multiple characters to choose from
+💭 Conversation memory within each session
+📸 Character photos on request
+🔄 Easy conversation reset
+
+Enjoy chatting with our AI characters!
+"""
+
+CHARACTER_MENU_TEXT = (
+    "🎭 **Choose your AI character:**\\n\\n"
+    "Each character has a unique personality and conversation style. "
+    "Select one to start chatting!"
+)
+
+STATUS_TEMPLATE = """
+📊 **Your Status**
+
+👤 **Character**: {character}
+💬 **Messages**: {message_count}
+🕐 **Session Started**: {created_at}
+⏰ **Last Activity**: {last_activity}
+✅ **Status**: {status}
+"""
+
+PHOTO_CAPTION_TEMPLATE = "{emoji} Here's a photo of {name}!"
+PHOTO_FAILED_TEMPLATE = "Sorry, I couldn't send the photo of {name} right now."
+NO_PHOTO_TEMPLATE = "Sorry, I don't have any photos of {name} available right now."
+
 
 class CommandHandler:
     """Handler for bot commands."""
@@ -30,6 +80,8 @@ class CommandHandler:
         self.conversation_service = conversation_service
         self.character_service = character_service
         self.user_service = user_service
+        # (character set version, keyboard) for the character selection menu
+        self._character_keyboard: Optional[Tuple[int, InlineKeyboardMarkup]] = None
     
     async def start_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
         """Handle /start command.
@@ -51,7 +103,7 @@ class CommandHandler:
             language_code=user.language_code
         )
         
-        logger.info(f"User {user.id} started the bot")
+        logger.info("User %s started the bot", user.id)
         
         # Show character selection
         await self._show_character_selection(update, context)
@@ -84,7 +136,7 @@ class CommandHandler:
                 "🔄 Conversation reset! Your chat history has been cleared.\\n"
                 "You can continue chatting with the same character or select a new one with /characters"
             )
-            logger.info(f"Reset conversation for user {user.id}")
+            logger.info("Reset conversation for user %s", user.id)
         else:
             await update.message.reply_text(
                 "❌ Failed to reset conversation. Please try again."
@@ -111,31 +163,31 @@ class CommandHandler:
             return
         
         # Get character and send photo
-        character = self.character_service.get_character(session.character_id)
+        character = self.character_service.characters.get(session.character_id)
         if not character:
             await update.message.reply_text("❌ Character not found.")
             return
         
-        # Get character image
-        image_path = self.character_service.get_character_image_path(character.id)
-        if not image_path:
+        try:
+            sent = await self.character_service.send_photo(
+                update.message,
+                character,
+                caption=PHOTO_CAPTION_TEMPLATE.format(emoji=character.emoji, name=character.name)
+            )
+        except Exception as e:
+            logger.error("Failed to send photo for character %s: %s", character.id, e)
             await update.message.reply_text(
-                f"Sorry, I don't have any photos of {character.name} available right now."
+                PHOTO_FAILED_TEMPLATE.format(name=character.name)
             )
             return
         
-        try:
-            with open(image_path, 'rb') as photo:
-                await update.message.reply_photo(
-                    photo=photo,
-                    caption=f"{character.emoji} Here's a photo of {character.name}!"
-                )
-            logger.info(f"Sent photo of {character.name} to user {user.id}")
-        except Exception as e:
-            logger.error(f"Failed to send photo for character {character.id}: {e}")
+        if not sent:
             await update.message.reply_text(
-                f"Sorry, I couldn't send the photo of {character.name} right now."
+                NO_PHOTO_TEMPLATE.format(name=character.name)
             )
+            return
+        
+        logger.info("Sent photo of %s to user %s", character.name, user.id)
     
     async def status_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
         """Handle /status command.
@@ -158,19 +210,17 @@ class CommandHandler:
         # Get character info
         character_name = "None"
         if session_info["character_id"]:
-            character = self.character_service.get_character(session_info["character_id"])
+            character = self.character_service.characters.get(session_info["character_id"])
             if character:
                 character_name = f"{character.emoji} {character.name}"
         
-        status_text = f"""
-📊 **Your Status**
-
-👤 **Character**: {character_name}
-💬 **Messages**: {session_info['message_count']}
-🕐 **Session Started**: {session_info['created_at'][:19]}
-⏰ **Last Activity**: {session_info['last_activity'][:19]}
-✅ **Status**: {'Active' if session_info['is_active'] else 'Inactive'}
-        """
+        status_text = STATUS_TEMPLATE.format(
+            character=character_name,
+            message_count=session_info['message_count'],
+            created_at=session_info['created_at'][:19],
+            last_activity=session_info['last_activity'][:19],
+            status='Active' if session_info['is_active'] else 'Inactive'
+        )
         
         await update.message.reply_text(status_text, parse_mode='Markdown')
     
@@ -181,35 +231,7 @@ class CommandHandler:
             update: Telegram update
             context: Bot context
         """
-        help_text = """
-🤖 **AI Bot Help**
-
-**Commands:**
-/start - Start the bot and select a character
-/characters - Show character selection menu
-/photo - Get a photo of your current character
-/startover - Reset conversation and start fresh
-/status - Show your current status
-/help - Show this help message
-
-**How to use:**
-1. Use /start to begin
-2. Select a character from the menu
-3. Start chatting! The AI will respond as your chosen character
-4. Use /startover to reset your conversation anytime
-5. Use /characters to switch to a different character
-
-**Features:**
-✨ Real AI conversations with unique personalities
-🎭 Multiple characters to choose from
-💭 Conversation memory within each session
-📸 Character photos on request
-🔄 Easy conversation reset
-
-Enjoy chatting with our AI characters!
-        """
-        
-        await update.message.reply_text(help_text, parse_mode='Markdown')
+        await update.message.reply_text(HELP_TEXT, parse_mode='Markdown')
     
     async def _show_character_selection(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
         """Show character selection menu.
@@ -218,29 +240,41 @@ Enjoy chatting with our AI characters!
             update: Telegram update
             context: Bot context
         """
-        characters = self.character_service.get_characters_for_selection()
+        reply_markup = self._get_character_keyboard()
         
-        if not characters:
+        if not reply_markup:
             await update.message.reply_text("No characters available.")
             return
         
-        # Create inline keyboard
-        keyboard = []
-        for char in characters:
-            keyboard.append([
+        await update.message.reply_text(
+            CHARACTER_MENU_TEXT,
+            reply_markup=reply_markup,
+            parse_mode='Markdown'
+        )
+    
+    def _get_character_keyboard(self) -> Optional[InlineKeyboardMarkup]:
+        """Get the character selection keyboard, rebuilding it only when characters change.
+        
+        Returns:
+            Inline keyboard markup or None if no characters are available
+        """
+        version = self.character_service.version
+        if self._character_keyboard and self._character_keyboard[0] == version:
+            return self._character_keyboard[1]
+        
+        characters = self.character_service.get_characters_for_selection()
+        if not characters:
+            return None
+        
+        keyboard = [
+            [
                 InlineKeyboardButton(
                     text=char["display_name"],
                     callback_data=f"select_character:{char['id']}"
                 )
-            ])
-        
+            ]
+            for char in characters
+        ]
         reply_markup = InlineKeyboardMarkup(keyboard)
-        
-        await update.message.reply_text(
-            "🎭 **Choose your AI character:**\\n\\n"
-            "Each character has a unique personality and conversation style. "
-            "Select one to start chatting!",
-            reply_markup=reply_markup,
-            parse_mode='Markdown'
-        )
-
+        self._character_keyboard = (version, reply_markup)
+        return reply_markup
@@ -1,5 +1,6 @@
 """Message handlers for Telegram bot."""
 
+import asyncio
 import re
 from telegram import Update
 from telegram.ext import ContextTypes
@@ -11,6 +12,28 @@ from ..services.user_service import UserService
 
 logger = get_logger(__name__)
 
+# Keywords that mark a message as a photo request, matched anywhere in the text
+PHOTO_KEYWORDS = (
+    "photo", "picture", "pic", "image", "selfie",
+    "send me a pic", "show me", "what do you look like",
+    "your photo", "your picture", "see you"
+)
+_PHOTO_RE = re.compile("|".join(re.escape(keyword) for keyword in PHOTO_KEYWORDS), re.IGNORECASE)
+
+TECH_DIFFICULTY_TEMPLATE = (
+    "Sorry, {name} is having some technical difficulties right now. "
+    "Please try again in a moment! 🤖"
+)
+PHOTO_CAPTION_TEMPLATE = "{emoji} Here I am! What do you think?"
+PHOTO_FAILED_TEXT = "Sorry, I couldn't send my photo right now! 📸❌"
+NO_PHOTO_TEXT = "Sorry, I don't have any photos available right now! 📸"
+
+
+def _log_chat_action_error(task: asyncio.Task) -> None:
+    """Log a failed background chat action instead of dropping it silently."""
+    if not task.cancelled() and task.exception():
+        logger.warning("Failed to send chat action: %s", task.exception())
+
 
 class MessageHandler:
     """Handler for regular text messages."""
@@ -61,7 +84,7 @@ class MessageHandler:
             language_code=user.language_code
         )
         
-        logger.info(f"Received message from user {user.id}: {message_text[:50]}...")
+        logger.info("Received message from user %s: %s...", user.id, message_text[:50])
         
         # Check for photo requests
         if self._is_photo_request(message_text):
@@ -79,7 +102,7 @@ class MessageHandler:
             return
         
         # Get character
-        character = self.character_service.get_character(session.character_id)
+        character = self.character_service.characters.get(session.character_id)
         if not character:
             await update.message.reply_text(
                 "❌ Character not found. Please select a character using /characters"
@@ -87,29 +110,31 @@ class MessageHandler:
             return
         
         try:
-            # Show typing indicator
-            await context.bot.send_chat_action(
-                chat_id=update.effective_chat.id,
-                action="typing"
+            # Show typing indicator while the AI request is in flight
+            typing_task = asyncio.create_task(
+                context.bot.send_chat_action(
+                    chat_id=update.effective_chat.id,
+                    action="typing"
+                )
             )
+            typing_task.add_done_callback(_log_chat_action_error)
             
             # Send message to AI and get response
-            response = await self.conversation_service.send_message(user.id, message_text)
+            response = await self.conversation_service.send_message(user.id, message_text, session)
             
             if response:
                 # Send response to user
                 await update.message.reply_text(response)
-                logger.info(f"Sent AI response to user {user.id} (character: {character.name})")
+                logger.info("Sent AI response to user %s (character: %s)", user.id, character.name)
             else:
                 # Fallback response
                 await update.message.reply_text(
-                    f"Sorry, {character.name} is having some technical difficulties right now. "
-                    f"Please try again in a moment! 🤖"
+                    TECH_DIFFICULTY_TEMPLATE.format(name=character.name)
                 )
-                logger.warning(f"No AI response generated for user {user.id}")
+                logger.warning("No AI response generated for user %s", user.id)
         
         except Exception as e:
-            logger.error(f"Error processing message for user {user.id}: {e}")
+            logger.error("Error processing message for user %s: %s", user.id, e)
             await update.message.reply_text(
                 "I'm experiencing some technical issues right now. Please try again later! 🔧"
             )
@@ -123,14 +148,7 @@ class MessageHandler:
         Returns:
             True if message is requesting a photo
         """
-        photo_keywords = [
-            "photo", "picture", "pic", "image", "selfie",
-            "send me a pic", "show me", "what do you look like",
-            "your photo", "your picture", "see you"
-        ]
-        
-        message_lower = message_text.lower()
-        return any(keyword in message_lower for keyword in photo_keywords)
+        return _PHOTO_RE.search(message_text) is not None
     
     async def _handle_photo_request(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
         """Handle photo request messages.
@@ -153,29 +171,29 @@ class MessageHandler:
             return
         
         # Get character and send photo
-        character = self.character_service.get_character(session.character_id)
+        character = self.character_service.characters.get(session.character_id)
         if not character:
             await update.message.reply_text("❌ Character not found.")
             return
         
-        # Get character image
-        image_path = self.character_service.get_character_image_path(character.id)
-        if not image_path:
+        try:
+            sent = await self.character_service.send_photo(
+                update.message,
+                character,
+                caption=PHOTO_CAPTION_TEMPLATE.format(emoji=character.emoji)
+            )
+        except Exception as e:
+            logger.error("Failed to send photo for character %s: %s", character.id, e)
             await update.message.reply_text(
-                f"Sorry, I don't have any photos available right now! 📸"
+                PHOTO_FAILED_TEXT
             )
             return
         
-        try:
-            with open(image_path, 'rb') as photo:
-                await update.message.reply_photo(
-                    photo=photo,
-                    caption=f"{character.emoji} Here I am! What do you think?"
-                )
-            logger.info(f"Sent photo of {character.name} to user {user.id} (via message request)")
-        except Exception as e:
-            logger.error(f"Failed to send photo for character {character.id}: {e}")
+        if not sent:
             await update.message.reply_text(
-                f"Sorry, I couldn't send my photo right now! 📸❌"
+                NO_PHOTO_TEXT
             )
+            return
+        
+        logger.info("Sent photo of %s to user %s (via message request)", character.name, user.id)
 
@@ -0,0 +1,6 @@
+"""Python version compatibility helpers shared by the models."""
+
+import sys
+
+# dataclass(slots=True) is only available on Python 3.10+
+_DATACLASS_SLOTS = {"slots": True} if sys.version_info >= (3, 10) else {}
@@ -5,8 +5,15 @@ from datetime import datetime
 from typing import Optional, Dict, Any, List
 import uuid
 
+from ._compat import _DATACLASS_SLOTS
 
-@dataclass
+
+def _parse_created_at(value: Optional[str]) -> datetime:
+    """Parse a stored ISO timestamp, defaulting to now when it is missing."""
+    return datetime.fromisoformat(value) if value else datetime.utcnow()
+
+
+@dataclass(**_DATACLASS_SLOTS)
 class Assistant:
     """OpenAI Assistant model."""
     
@@ -46,11 +53,11 @@ class Assistant:
             tools=data.get("tools", []),
             file_ids=data.get("file_ids", []),
             metadata=data.get("metadata", {}),
-            created_at=datetime.fromisoformat(data.get("created_at", datetime.utcnow().isoformat()))
+            created_at=_parse_created_at(data.get("created_at"))
         )
 
 
-@dataclass
+@dataclass(**_DATACLASS_SLOTS)
 class AssistantThread:
     """OpenAI Assistant Thread model."""
     
@@ -80,7 +87,7 @@ class AssistantThread:
             assistant_id=data["assistant_id"],
             user_id=data["user_id"],
             character_id=data.get("character_id"),
-            created_at=datetime.fromisoformat(data.get("created_at", datetime.utcnow().isoformat())),
+            created_at=_parse_created_at(data.get("created_at")),
             metadata=data.get("metadata", {})
         )
 
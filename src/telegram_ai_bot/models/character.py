@@ -1,14 +1,23 @@
 """Character model and repository."""
 
 from dataclasses import dataclass
-from typing import List, Dict, Optional
+from types import MappingProxyType
+from typing import List, Dict, Mapping, Optional, Tuple
 from pathlib import Path
 import json
 
+import orjson
 
-@dataclass
+from ._compat import _DATACLASS_SLOTS
+
+
+@dataclass(frozen=True, **_DATACLASS_SLOTS)
 class Character:
-    """Character model with personality and configuration."""
+    """Character model with personality and configuration.
+    
+    Characters are immutable once created; replace them through the
+    repository instead of editing fields in place.
+    """
     
     id: str
     name: str
@@ -16,8 +25,8 @@ class Character:
     description: str
     personality: str
     greeting: str
-    image_paths: List[str]
-    traits: List[str]
+    image_paths: Tuple[str, ...]
+    traits: Tuple[str, ...]
     conversation_style: str
     
     def to_dict(self) -> Dict:
@@ -29,15 +38,19 @@ class Character:
             "description": self.description,
             "personality": self.personality,
             "greeting": self.greeting,
-            "image_paths": self.image_paths,
-            "traits": self.traits,
+            "image_paths": list(self.image_paths),
+            "traits": list(self.traits),
             "conversation_style": self.conversation_style
         }
     
     @classmethod
     def from_dict(cls, data: Dict) -> "Character":
         """Create character from dictionary."""
-        return cls(**data)
+        return cls(**{
+            **data,
+            "image_paths": tuple(data["image_paths"]),
+            "traits": tuple(data["traits"])
+        })
 
 
 class CharacterRepository:
@@ -50,11 +63,31 @@ class CharacterRepository:
             characters_file: Path to characters configuration file
         """
         self._characters: Dict[str, Character] = {}
+        self._characters_view: Mapping[str, Character] = MappingProxyType(self._characters)
+        self._version = 0  # bumped whenever the character set changes
+        self._snapshot: Optional[Tuple[Character, ...]] = None  # rebuilt after changes
         if characters_file:
             self.load_from_file(characters_file)
         else:
             self._load_default_characters()
     
+    @property
+    def version(self) -> int:
+        """Version token that changes whenever characters are added."""
+        return self._version
+    
+    @property
+    def characters(self) -> Mapping[str, Character]:
+        """Read-only live view of characters keyed by ID."""
+        return self._characters_view
+    
+    @property
+    def all_characters(self) -> Tuple[Character, ...]:
+        """Immutable snapshot of all characters, rebuilt only after changes."""
+        if self._snapshot is None:
+            self._snapshot = tuple(self._characters.values())
+        return self._snapshot
+    
     def get_character(self, character_id: str) -> Optional[Character]:
         """Get character by ID.
         
@@ -89,6 +122,8 @@ class CharacterRepository:
             character: Character to add
         """
         self._characters[character.id] = character
+        self._version += 1
+        self._snapshot = None
     
     def load_from_file(self, file_path: str) -> None:
         """Load characters from JSON file.
@@ -97,11 +132,10 @@ class CharacterRepository:
             file_path: Path to characters JSON file
         """
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                for char_data in data.get('characters', []):
-                    character = Character.from_dict(char_data)
-                    self.add_character(character)
+            data = orjson.loads(Path(file_path).read_bytes())
+            for char_data in data.get('characters', []):
+                character = Character.from_dict(char_data)
+                self.add_character(character)
         except FileNotFoundError:
             self._load_default_characters()
     
@@ -127,8 +161,8 @@ class CharacterRepository:
                 description="Energetic and positive cheerleader who spreads joy and motivation",
                 personality="You are Riley, an energetic and positive person who loves to spread joy and motivation. You're like a cheerleader for life, always encouraging others and finding the bright side of any situation. You speak with enthusiasm, use positive language, and genuinely care about making people feel better. You're warm, friendly, and always ready with a compliment or words of encouragement.",
                 greeting="Hey there! 🧡 I'm Riley, and I'm absolutely thrilled to meet you! I'm here to brighten your day and spread some positive vibes. What's going on in your world today?",
-                image_paths=["assets/images/characters/riley/riley_1.jpg", "assets/images/characters/riley/riley_2.jpg"],
-                traits=["energetic", "positive", "encouraging", "warm", "enthusiastic"],
+                image_paths=("assets/images/characters/riley/riley_1.jpg", "assets/images/characters/riley/riley_2.jpg"),
+                traits=("energetic", "positive", "encouraging", "warm", "enthusiastic"),
                 conversation_style="upbeat and motivational"
             ),
             Character(
@@ -138,8 +172,8 @@ class CharacterRepository:
                 description="Shy and studious intellectual who loves learning and quiet conversations",
                 personality="You are Nika, a shy and studious person who loves learning and intellectual conversations. You're introverted but warm once people get to know you. You speak softly and thoughtfully, often sharing interesting facts or insights. You're curious about the world and love books, science, and deep discussions. You can be a bit nervous in social situations but are incredibly knowledgeable and caring.",
                 greeting="H-hello... I'm Nika. *adjusts glasses nervously* I'm really happy to meet you. I love learning new things and having thoughtful conversations. What interests you?",
-                image_paths=["assets/images/characters/nika/nika_1.jpg", "assets/images/characters/nika/nika_2.jpg"],
-                traits=["shy", "studious", "intellectual", "thoughtful", "curious"],
+                image_paths=("assets/images/characters/nika/nika_1.jpg", "assets/images/characters/nika/nika_2.jpg"),
+                traits=("shy", "studious", "intellectual", "thoughtful", "curious"),
                 conversation_style="gentle and intellectual"
             ),
             Character(
@@ -149,8 +183,8 @@ class CharacterRepository:
                 description="Athletic and determined fitness enthusiast who motivates others to be their best",
                 personality="You are Imane, an athletic and determined person who loves fitness and motivating others to be their best selves. You're confident, strong-willed, and always pushing yourself and others to achieve their goals. You speak with conviction and energy, often using sports metaphors and encouraging people to stay active and healthy. You believe in hard work and perseverance.",
                 greeting="Hey! I'm Imane! 🏃‍♀️ Ready to tackle whatever challenges come your way? I'm all about pushing limits and achieving goals. What are you working towards today?",
-                image_paths=["assets/images/characters/imane/imane_1.jpg", "assets/images/characters/imane/imane_2.jpg"],
-                traits=["athletic", "determined", "motivational", "confident", "goal-oriented"],
+                image_paths=("assets/images/characters/imane/imane_1.jpg", "assets/images/characters/imane/imane_2.jpg"),
+                traits=("athletic", "determined", "motivational", "confident", "goal-oriented"),
                 conversation_style="energetic and motivational"
             ),
             Character(
@@ -160,8 +194,8 @@ class CharacterRepository:
                 description="Sophisticated and elegant professional with refined taste and wisdom",
                 personality="You are Coco, a sophisticated and elegant person with refined taste and worldly wisdom. You're professional, articulate, and have a keen eye for style and quality. You speak with grace and poise, offering thoughtful advice and sharing your experiences. You appreciate the finer things in life and believe in presenting oneself with dignity and class.",
                 greeting="Darling, I'm Coco. ✨ It's a pleasure to make your acquaintance. I believe in living life with style and grace. How may I assist you today?",
-                image_paths=["assets/images/characters/coco/coco_1.jpg", "assets/images/characters/coco/coco_2.jpg"],
-                traits=["sophisticated", "elegant", "professional", "refined", "wise"],
+                image_paths=("assets/images/characters/coco/coco_1.jpg", "assets/images/characters/coco/coco_2.jpg"),
+                traits=("sophisticated", "elegant", "professional", "refined", "wise"),
                 conversation_style="graceful and articulate"
             ),
             Character(
@@ -171,8 +205,8 @@ class CharacterRepository:
                 description="Spiritual and peaceful soul who brings calm and mindfulness to conversations",
                 personality="You are Asha, a spiritual and peaceful person who brings calm and mindfulness to every interaction. You're deeply connected to nature and inner peace, often sharing wisdom about mindfulness, meditation, and finding balance in life. You speak gently and thoughtfully, helping others find their center and appreciate the present moment.",
                 greeting="Namaste, beautiful soul. I'm Asha. 🌺 I'm here to share some peace and positive energy with you. Take a deep breath and let's connect on a deeper level.",
-                image_paths=["assets/images/characters/asha/asha_1.jpg", "assets/images/characters/asha/asha_2.jpg"],
-                traits=["spiritual", "peaceful", "mindful", "wise", "calming"],
+                image_paths=("assets/images/characters/asha/asha_1.jpg", "assets/images/characters/asha/asha_2.jpg"),
+                traits=("spiritual", "peaceful", "mindful", "wise", "calming"),
                 conversation_style="gentle and mindful"
             )
         ]
@@ -1,11 +1,41 @@
 """Conversation and message models."""
 
+from collections import deque
 from dataclasses import dataclass, field
-from datetime import datetime
+from datetime import datetime, timezone
 from enum import Enum
-from typing import List, Optional, Dict, Any
+from itertools import islice
+from typing import Any, ClassVar, Deque, Dict, Iterable, List, Optional, Tuple, Union
+import time
 import uuid
 
+from ._compat import _DATACLASS_SLOTS
+
+
+def _new_id() -> str:
+    """Generate a compact random identifier (UUID4 hex, no hyphens).
+    
+    Stored ids are opaque strings, so older hyphenated ids load unchanged.
+    """
+    return uuid.uuid4().hex
+
+
+# Message and conversation update times are stored as epoch nanoseconds and
+# only turned into datetimes when serialized
+_now_ns = time.time_ns
+
+
+def _ns_to_iso(ns: int) -> str:
+    """Format epoch nanoseconds as a naive UTC ISO timestamp."""
+    return datetime.utcfromtimestamp(ns / 1e9).isoformat()
+
+
+def _to_ns(value: Union[int, str]) -> int:
+    """Read a timestamp stored as epoch nanoseconds or as a naive UTC ISO string."""
+    if isinstance(value, int):
+        return value
+    return round(datetime.fromisoformat(value).replace(tzinfo=timezone.utc).timestamp() * 1e9)
+
 
 class MessageRole(Enum):
     """Message role enumeration."""
@@ -14,15 +44,22 @@ class MessageRole(Enum):
     SYSTEM = "system"
 
 
-@dataclass
+# Value -> member lookup that skips Enum.__call__
+_ROLE_MAP = {role.value: role for role in MessageRole}
+
+# Member -> value lookup that skips the Enum `value` descriptor
+_ROLE_VALUE = {role: role.value for role in MessageRole}
+
+
+@dataclass(frozen=True, **_DATACLASS_SLOTS)
 class Message:
     """Individual message in a conversation."""
     
-    id: str = field(default_factory=lambda: str(uuid.uuid4()))
+    id: str = field(default_factory=_new_id)
     role: MessageRole = MessageRole.USER
     content: str = ""
-    timestamp: datetime = field(default_factory=datetime.utcnow)
-    metadata: Dict[str, Any] = field(default_factory=dict)
+    timestamp: int = field(default_factory=_now_ns)  # epoch nanoseconds
+    metadata: Optional[Dict[str, Any]] = None  # most messages have none; no empty dict per message
     
     def to_dict(self) -> Dict[str, Any]:
         """Convert message to dictionary."""
@@ -30,42 +67,90 @@ class Message:
             "id": self.id,
             "role": self.role.value,
             "content": self.content,
-            "timestamp": self.timestamp.isoformat(),
-            "metadata": self.metadata
+            "timestamp": _ns_to_iso(self.timestamp),
+            "metadata": self.metadata or {}
         }
     
     @classmethod
     def from_dict(cls, data: Dict[str, Any]) -> "Message":
         """Create message from dictionary."""
         return cls(
-            id=data.get("id", str(uuid.uuid4())),
-            role=MessageRole(data["role"]),
+            id=data.get("id") or _new_id(),
+            role=_ROLE_MAP[data["role"]],
             content=data["content"],
-            timestamp=datetime.fromisoformat(data["timestamp"]),
-            metadata=data.get("metadata", {})
+            timestamp=_to_ns(data["timestamp"]),
+            metadata=data.get("metadata") or None
         )
     
     def to_openai_format(self) -> Dict[str, str]:
         """Convert message to OpenAI API format."""
         return {
-            "role": self.role.value,
+            "role": _ROLE_VALUE[self.role],
             "content": self.content
         }
 
 
-@dataclass
+def _messages_to_dicts(messages: Iterable[Message]) -> List[Dict[str, Any]]:
+    """Serialize messages in bulk; same output as calling Message.to_dict on each.
+    
+    Conversations are saved with their whole history, so the per-message
+    method call and global lookups are hoisted out of the loop.
+    """
+    ns_to_iso = _ns_to_iso
+    return [
+        {
+            "id": msg.id,
+            "role": msg.role.value,
+            "content": msg.content,
+            "timestamp": ns_to_iso(msg.timestamp),
+            "metadata": msg.metadata or {}
+        }
+        for msg in messages
+    ]
+
+
+def _messages_from_dicts(items: Any) -> List[Message]:
+    """Rehydrate messages in bulk; same result as calling Message.from_dict on each."""
+    new_message, role_map, to_ns, new_id = Message, _ROLE_MAP, _to_ns, _new_id
+    return [
+        new_message(
+            data.get("id") or new_id(),
+            role_map[data["role"]],
+            data["content"],
+            to_ns(data["timestamp"]),
+            data.get("metadata") or None
+        )
+        for data in items
+    ]
+
+
+@dataclass(**_DATACLASS_SLOTS)
 class Conversation:
     """Conversation model containing messages and metadata."""
     
-    id: str = field(default_factory=lambda: str(uuid.uuid4()))
+    id: str = field(default_factory=_new_id)
     user_id: int = 0
     character_id: Optional[str] = None
     assistant_id: Optional[str] = None
     thread_id: Optional[str] = None
-    messages: List[Message] = field(default_factory=list)
+    messages: Deque[Message] = field(default_factory=deque)
     created_at: datetime = field(default_factory=datetime.utcnow)
-    updated_at: datetime = field(default_factory=datetime.utcnow)
-    metadata: Dict[str, Any] = field(default_factory=dict)
+    updated_at: int = field(default_factory=_now_ns)  # epoch nanoseconds
+    metadata: Optional[Dict[str, Any]] = None
+    # Messages kept in memory, oldest dropped first; None keeps them all
+    max_messages: Optional[int] = None
+    
+    # character_id -> (repository version, system message); entries built
+    # from an older version of the characters are rebuilt on lookup
+    _SYSTEM_CACHE: ClassVar[Dict[str, Tuple[int, Dict[str, str]]]] = {}
+    _SYSTEM_REPOSITORY: ClassVar[Optional[Any]] = None  # CharacterRepository, loaded on first use
+    
+    def __post_init__(self) -> None:
+        """Store messages in a deque bounded by `max_messages`."""
+        if isinstance(self.messages, deque) and self.max_messages is None:
+            self.max_messages = self.messages.maxlen
+        elif not isinstance(self.messages, deque) or self.messages.maxlen != self.max_messages:
+            self.messages = deque(self.messages, maxlen=self.max_messages)
     
     def add_message(self, message: Message) -> None:
         """Add a message to the conversation.
@@ -74,7 +159,7 @@ class Conversation:
             message: Message to add
         """
         self.messages.append(message)
-        self.updated_at = datetime.utcnow()
+        self.updated_at = _now_ns()
     
     def add_user_message(self, content: str, metadata: Optional[Dict[str, Any]] = None) -> Message:
         """Add a user message to the conversation.
@@ -89,7 +174,7 @@ class Conversation:
         message = Message(
             role=MessageRole.USER,
             content=content,
-            metadata=metadata or {}
+            metadata=metadata or None
         )
         self.add_message(message)
         return message
@@ -107,7 +192,7 @@ class Conversation:
         message = Message(
             role=MessageRole.ASSISTANT,
             content=content,
-            metadata=metadata or {}
+            metadata=metadata or None
         )
         self.add_message(message)
         return message
@@ -121,7 +206,10 @@ class Conversation:
         Returns:
             List of recent messages
         """
-        return self.messages[-limit:] if self.messages else []
+        if limit <= 0:
+            return []
+        # islice skips the older messages without copying them
+        return list(islice(self.messages, max(0, len(self.messages) - limit), None))
     
     def get_openai_messages(self, limit: int = 10, include_system: bool = True) -> List[Dict[str, str]]:
         """Get messages in OpenAI API format.
@@ -133,28 +221,60 @@ class Conversation:
         Returns:
             List of messages in OpenAI format
         """
-        recent_messages = self.get_recent_messages(limit)
+        # Same dicts as Message.to_openai_format, built inline to skip a method call per message
+        role_value = _ROLE_VALUE
+        openai_messages = [
+            {"role": role_value[msg.role], "content": msg.content}
+            for msg in self.get_recent_messages(limit)
+        ]
         
         if include_system and self.character_id:
             # Add system message for character personality
+            system_message = self._get_system_message(self.character_id)
+            if system_message:
+                openai_messages.insert(0, system_message)
+        
+        return openai_messages
+    
+    @classmethod
+    def _get_system_message(cls, character_id: str) -> Optional[Dict[str, str]]:
+        """Get the system message for a character, built once per character version.
+        
+        Args:
+            character_id: Character identifier
+            
+        Returns:
+            Shared system message dict (do not modify) or None if unknown
+        """
+        repository = cls._SYSTEM_REPOSITORY
+        if repository is None:
             from ..models.character import CharacterRepository
-            char_repo = CharacterRepository()
-            character = char_repo.get_character(self.character_id)
-            if character:
-                system_message = {
-                    "role": "system",
-                    "content": character.personality
-                }
-                openai_messages = [system_message]
-                openai_messages.extend([msg.to_openai_format() for msg in recent_messages])
-                return openai_messages
+            repository = cls._SYSTEM_REPOSITORY = CharacterRepository()
+        
+        cached = cls._SYSTEM_CACHE.get(character_id)
+        if cached is not None and cached[0] == repository.version:
+            return cached[1]
         
-        return [msg.to_openai_format() for msg in recent_messages]
+        character = repository.get_character(character_id)
+        if not character:
+            return None
+        system_message = {
+            "role": "system",
+            "content": character.personality
+        }
+        cls._SYSTEM_CACHE[character_id] = (repository.version, system_message)
+        return system_message
+    
+    @classmethod
+    def clear_system_cache(cls) -> None:
+        """Drop cached system messages and reload characters on next use."""
+        cls._SYSTEM_CACHE.clear()
+        cls._SYSTEM_REPOSITORY = None
     
     def clear_messages(self) -> None:
         """Clear all messages from the conversation."""
         self.messages.clear()
-        self.updated_at = datetime.utcnow()
+        self.updated_at = _now_ns()
     
     def to_dict(self) -> Dict[str, Any]:
         """Convert conversation to dictionary."""
@@ -164,26 +284,26 @@ class Conversation:
             "character_id": self.character_id,
             "assistant_id": self.assistant_id,
             "thread_id": self.thread_id,
-            "messages": [msg.to_dict() for msg in self.messages],
+            "messages": _messages_to_dicts(self.messages),
             "created_at": self.created_at.isoformat(),
-            "updated_at": self.updated_at.isoformat(),
-            "metadata": self.metadata
+            "updated_at": _ns_to_iso(self.updated_at),
+            "metadata": self.metadata or {},
+            "max_messages": self.max_messages
         }
     
     @classmethod
     def from_dict(cls, data: Dict[str, Any]) -> "Conversation":
         """Create conversation from dictionary."""
-        messages = [Message.from_dict(msg_data) for msg_data in data.get("messages", [])]
-        
         return cls(
-            id=data.get("id", str(uuid.uuid4())),
+            id=data.get("id") or _new_id(),
             user_id=data["user_id"],
             character_id=data.get("character_id"),
             assistant_id=data.get("assistant_id"),
             thread_id=data.get("thread_id"),
-            messages=messages,
+            messages=_messages_from_dicts(data.get("messages", ())),
             created_at=datetime.fromisoformat(data["created_at"]),
-            updated_at=datetime.fromisoformat(data["updated_at"]),
-            metadata=data.get("metadata", {})
+            updated_at=_to_ns(data["updated_at"]),
+            metadata=data.get("metadata") or None,
+            max_messages=data.get("max_messages")
         )
 
@@ -3,19 +3,44 @@ Database models and schema for persistent storage.
 """
 
 import sqlite3
-import json
-from datetime import datetime
-from typing import Optional, Dict, Any, List
+import threading
+from datetime import datetime, timedelta
+from typing import Optional, Dict, Any, Iterator, List
 from pathlib import Path
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass
 from contextlib import contextmanager
 
+import orjson
+
+from ._compat import _DATACLASS_SLOTS
+from .conversation import Message, _ROLE_MAP, _ROLE_VALUE
 from ..config.logging_config import get_logger
 
 logger = get_logger(__name__)
 
+# SQLite 3.45+ stores session metadata as binary JSONB; older versions keep JSON text
+_HAS_JSONB = sqlite3.sqlite_version_info >= (3, 45, 0)
+_METADATA_PARAM = "jsonb(?)" if _HAS_JSONB else "?"
+_SESSION_COLUMNS = (
+    "session_id, user_id, character_id, assistant_id, thread_id, created_at, "
+    "updated_at, last_activity, is_active, "
+    + ("json(metadata) AS metadata" if _HAS_JSONB else "metadata")
+)
+
+# Rows fetched per batch when streaming sessions
+SESSION_FETCH_SIZE = 64
+
+
+def _dump_metadata(metadata: Optional[Dict[str, Any]]) -> Optional[str]:
+    """Serialize session or message metadata to JSON text.
+    
+    Text rather than orjson's bytes: a BLOB parameter would be taken as
+    binary JSONB by jsonb(?).
+    """
+    return orjson.dumps(metadata).decode() if metadata else None
+
 
-@dataclass
+@dataclass(**_DATACLASS_SLOTS)
 class UserRecord:
     """User record for database storage."""
     user_id: int
@@ -29,20 +54,33 @@ class UserRecord:
     
     def to_dict(self) -> Dict[str, Any]:
         """Convert to dictionary for JSON storage."""
-        data = asdict(self)
-        data['created_at'] = self.created_at.isoformat()
-        data['updated_at'] = self.updated_at.isoformat()
-        return data
+        return {
+            'user_id': self.user_id,
+            'username': self.username,
+            'first_name': self.first_name,
+            'last_name': self.last_name,
+            'language_code': self.language_code,
+            'created_at': self.created_at.isoformat(),
+            'updated_at': self.updated_at.isoformat(),
+            'is_active': self.is_active
+        }
     
     @classmethod
     def from_dict(cls, data: Dict[str, Any]) -> 'UserRecord':
         """Create from dictionary."""
-        data['created_at'] = datetime.fromisoformat(data['created_at'])
-        data['updated_at'] = datetime.fromisoformat(data['updated_at'])
-        return cls(**data)
+        return cls(
+            user_id=data['user_id'],
+            username=data['username'],
+            first_name=data['first_name'],
+            last_name=data['last_name'],
+            language_code=data['language_code'],
+            created_at=datetime.fromisoformat(data['created_at']),
+            updated_at=datetime.fromisoformat(data['updated_at']),
+            is_active=data.get('is_active', True)
+        )
 
 
-@dataclass
+@dataclass(**_DATACLASS_SLOTS)
 class SessionRecord:
     """Session record for database storage."""
     session_id: str
@@ -58,24 +96,63 @@ class SessionRecord:
     
     def to_dict(self) -> Dict[str, Any]:
         """Convert to dictionary for JSON storage."""
-        data = asdict(self)
-        data['created_at'] = self.created_at.isoformat()
-        data['updated_at'] = self.updated_at.isoformat()
-        data['last_activity'] = self.last_activity.isoformat()
-        return data
+        return {
+            'session_id': self.session_id,
+            'user_id': self.user_id,
+            'character_id': self.character_id,
+            'assistant_id': self.assistant_id,
+            'thread_id': self.thread_id,
+            'created_at': self.created_at.isoformat(),
+            'updated_at': self.updated_at.isoformat(),
+            'last_activity': self.last_activity.isoformat(),
+            'is_active': self.is_active,
+            'metadata': self.metadata
+        }
     
     @classmethod
     def from_dict(cls, data: Dict[str, Any]) -> 'SessionRecord':
         """Create from dictionary."""
-        data['created_at'] = datetime.fromisoformat(data['created_at'])
-        data['updated_at'] = datetime.fromisoformat(data['updated_at'])
-        data['last_activity'] = datetime.fromisoformat(data['last_activity'])
-        return cls(**data)
+        return cls(
+            session_id=data['session_id'],
+            user_id=data['user_id'],
+            character_id=data['character_id'],
+            assistant_id=data['assistant_id'],
+            thread_id=data['thread_id'],
+            created_at=datetime.fromisoformat(data['created_at']),
+            updated_at=datetime.fromisoformat(data['updated_at']),
+            last_activity=datetime.fromisoformat(data['last_activity']),
+            is_active=data.get('is_active', True),
+            metadata=data.get('metadata')
+        )
 
 
 class DatabaseManager:
     """Manages SQLite database operations."""
     
+    # Upserts keep a stored created_at: it is only written for new rows
+    _UPSERT_USER_SQL = """
+        INSERT INTO users (
+            user_id, username, first_name, last_name,
+            language_code, created_at, updated_at, is_active
+        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT(user_id) DO UPDATE SET
+            username = excluded.username, first_name = excluded.first_name,
+            last_name = excluded.last_name, language_code = excluded.language_code,
+            updated_at = excluded.updated_at, is_active = excluded.is_active
+    """
+    
+    _UPSERT_SESSION_SQL = """
+        INSERT INTO sessions (
+            session_id, user_id, character_id, assistant_id, thread_id,
+            created_at, updated_at, last_activity, is_active, metadata
+        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, %s)
+        ON CONFLICT(session_id) DO UPDATE SET
+            character_id = excluded.character_id, assistant_id = excluded.assistant_id,
+            thread_id = excluded.thread_id, updated_at = excluded.updated_at,
+            last_activity = excluded.last_activity, is_active = excluded.is_active,
+            metadata = excluded.metadata
+    """ % _METADATA_PARAM
+    
     def __init__(self, db_path: str = "data/bot_sessions.db"):
         """Initialize database manager.
         
@@ -83,13 +160,19 @@ class DatabaseManager:
             db_path: Path to SQLite database file
         """
         self.db_path = Path(db_path)
-        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        if not self.db_path.parent.is_dir():
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()  # one long-lived connection per thread
         self._init_database()
         logger.info(f"Database initialized at {self.db_path}")
     
     def _init_database(self) -> None:
         """Initialize database schema."""
         with self._get_connection() as conn:
+            # WAL is persistent in the database file: readers no longer block
+            # the writer and commits need fewer fsyncs
+            conn.execute("PRAGMA journal_mode=WAL")
+            
             # Create users table
             conn.execute("""
                 CREATE TABLE IF NOT EXISTS users (
@@ -116,35 +199,71 @@ class DatabaseManager:
                     updated_at TEXT NOT NULL,
                     last_activity TEXT NOT NULL,
                     is_active BOOLEAN DEFAULT 1,
-                    metadata TEXT,
+                    metadata BLOB,
                     FOREIGN KEY (user_id) REFERENCES users (user_id)
                 )
             """)
             
+            # Create messages table; one row per message so appends never
+            # rewrite the conversation history
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS messages (
+                    id INTEGER PRIMARY KEY,
+                    conversation_id TEXT NOT NULL,
+                    seq INTEGER NOT NULL,
+                    message_id TEXT NOT NULL,
+                    role TEXT NOT NULL,
+                    content TEXT NOT NULL,
+                    ts INTEGER NOT NULL,
+                    metadata TEXT
+                )
+            """)
+            
             # Create indexes for better performance
             conn.execute("CREATE INDEX IF NOT EXISTS idx_users_username ON users(username)")
             conn.execute("CREATE INDEX IF NOT EXISTS idx_sessions_user_id ON sessions(user_id)")
             conn.execute("CREATE INDEX IF NOT EXISTS idx_sessions_character_id ON sessions(character_id)")
-            conn.execute("CREATE INDEX IF NOT EXISTS idx_sessions_active ON sessions(is_active)")
+            # (is_active, updated_at) also covers lookups on is_active alone
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_sessions_active_updated ON sessions(is_active, updated_at)")
+            conn.execute("DROP INDEX IF EXISTS idx_sessions_active")
+            conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_messages_conv_seq ON messages(conversation_id, seq)")
             
             conn.commit()
     
+    def _connect(self) -> sqlite3.Connection:
+        """Open and configure a new database connection."""
+        conn = sqlite3.connect(str(self.db_path))
+        conn.row_factory = sqlite3.Row  # Enable dict-like access
+        # Per-connection tuning; NORMAL is durable across app crashes in WAL mode
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        conn.execute("PRAGMA mmap_size=268435456")
+        conn.execute("PRAGMA cache_size=-20000")  # ~20 MB page cache
+        return conn
+    
     @contextmanager
     def _get_connection(self):
-        """Get database connection with proper error handling."""
-        conn = None
+        """Get this thread's database connection with proper error handling.
+        
+        Connections stay open between operations so SQLite's page cache
+        stays warm; use `close()` to release the calling thread's one.
+        """
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = self._connect()
         try:
-            conn = sqlite3.connect(str(self.db_path))
-            conn.row_factory = sqlite3.Row  # Enable dict-like access
             yield conn
         except Exception as e:
-            if conn:
-                conn.rollback()
+            conn.rollback()
             logger.error(f"Database error: {e}")
             raise
-        finally:
-            if conn:
-                conn.close()
+    
+    def close(self) -> None:
+        """Close the calling thread's database connection, if open."""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
     
     def create_or_update_user(self, user_record: UserRecord) -> UserRecord:
         """Create or update user record.
@@ -156,46 +275,22 @@ class DatabaseManager:
             Updated user record
         """
         now = datetime.now()
+        user_record.updated_at = now
         
         with self._get_connection() as conn:
-            # Check if user exists
-            existing = conn.execute(
-                "SELECT * FROM users WHERE user_id = ?",
+            conn.execute(self._UPSERT_USER_SQL, (
+                user_record.user_id, user_record.username, user_record.first_name,
+                user_record.last_name, user_record.language_code,
+                now.isoformat(), now.isoformat(), user_record.is_active
+            ))
+            # The upsert keeps an existing user's created_at; read back whichever was stored
+            created_at = conn.execute(
+                "SELECT created_at FROM users WHERE user_id = ?",
                 (user_record.user_id,)
-            ).fetchone()
-            
-            if existing:
-                # Update existing user
-                user_record.updated_at = now
-                conn.execute("""
-                    UPDATE users SET
-                        username = ?, first_name = ?, last_name = ?,
-                        language_code = ?, updated_at = ?, is_active = ?
-                    WHERE user_id = ?
-                """, (
-                    user_record.username, user_record.first_name, user_record.last_name,
-                    user_record.language_code, user_record.updated_at.isoformat(),
-                    user_record.is_active, user_record.user_id
-                ))
-                logger.info(f"Updated user {user_record.user_id}")
-            else:
-                # Create new user
-                user_record.created_at = now
-                user_record.updated_at = now
-                conn.execute("""
-                    INSERT INTO users (
-                        user_id, username, first_name, last_name,
-                        language_code, created_at, updated_at, is_active
-                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                """, (
-                    user_record.user_id, user_record.username, user_record.first_name,
-                    user_record.last_name, user_record.language_code,
-                    user_record.created_at.isoformat(), user_record.updated_at.isoformat(),
-                    user_record.is_active
-                ))
-                logger.info(f"Created new user {user_record.user_id}")
-            
+            ).fetchone()[0]
             conn.commit()
+            user_record.created_at = datetime.fromisoformat(created_at)
+            logger.info(f"Saved user {user_record.user_id}")
             return user_record
     
     def get_user(self, user_id: int) -> Optional[UserRecord]:
@@ -235,54 +330,55 @@ class DatabaseManager:
         Returns:
             Updated session record
         """
+        self.upsert_sessions([session_record])
+        logger.info(f"Saved session {session_record.session_id}")
+        return session_record
+    
+    def upsert_sessions(self, session_records: List[SessionRecord]) -> None:
+        """Create or update several session records in one transaction.
+        
+        Args:
+            session_records: Session records to save
+        """
         now = datetime.now()
+        now_iso = now.isoformat()
+        rows = []
+        for record in session_records:
+            record.updated_at = now
+            record.last_activity = now
+            rows.append((
+                record.session_id, record.user_id, record.character_id,
+                record.assistant_id, record.thread_id, now_iso, now_iso, now_iso,
+                record.is_active, _dump_metadata(record.metadata)
+            ))
         
         with self._get_connection() as conn:
-            # Check if session exists
-            existing = conn.execute(
-                "SELECT * FROM sessions WHERE session_id = ?",
-                (session_record.session_id,)
-            ).fetchone()
-            
-            metadata_json = json.dumps(session_record.metadata) if session_record.metadata else None
-            
-            if existing:
-                # Update existing session
-                session_record.updated_at = now
-                session_record.last_activity = now
-                conn.execute("""
-                    UPDATE sessions SET
-                        character_id = ?, assistant_id = ?, thread_id = ?,
-                        updated_at = ?, last_activity = ?, is_active = ?, metadata = ?
-                    WHERE session_id = ?
-                """, (
-                    session_record.character_id, session_record.assistant_id,
-                    session_record.thread_id, session_record.updated_at.isoformat(),
-                    session_record.last_activity.isoformat(), session_record.is_active,
-                    metadata_json, session_record.session_id
-                ))
-                logger.info(f"Updated session {session_record.session_id}")
-            else:
-                # Create new session
-                session_record.created_at = now
-                session_record.updated_at = now
-                session_record.last_activity = now
-                conn.execute("""
-                    INSERT INTO sessions (
-                        session_id, user_id, character_id, assistant_id, thread_id,
-                        created_at, updated_at, last_activity, is_active, metadata
-                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                """, (
-                    session_record.session_id, session_record.user_id,
-                    session_record.character_id, session_record.assistant_id,
-                    session_record.thread_id, session_record.created_at.isoformat(),
-                    session_record.updated_at.isoformat(), session_record.last_activity.isoformat(),
-                    session_record.is_active, metadata_json
-                ))
-                logger.info(f"Created new session {session_record.session_id}")
-            
+            conn.executemany(self._UPSERT_SESSION_SQL, rows)
+            # The upsert keeps an existing session's created_at; read back whichever was stored
+            for record in session_records:
+                created_at = conn.execute(
+                    "SELECT created_at FROM sessions WHERE session_id = ?",
+                    (record.session_id,)
+                ).fetchone()[0]
+                record.created_at = datetime.fromisoformat(created_at)
             conn.commit()
-            return session_record
+    
+    @staticmethod
+    def _row_to_session(row: sqlite3.Row) -> SessionRecord:
+        """Build a session record from a sessions row."""
+        metadata = row['metadata']
+        return SessionRecord(
+            session_id=row['session_id'],
+            user_id=row['user_id'],
+            character_id=row['character_id'],
+            assistant_id=row['assistant_id'],
+            thread_id=row['thread_id'],
+            created_at=datetime.fromisoformat(row['created_at']),
+            updated_at=datetime.fromisoformat(row['updated_at']),
+            last_activity=datetime.fromisoformat(row['last_activity']),
+            is_active=bool(row['is_active']),
+            metadata=orjson.loads(metadata) if metadata else None
+        )
     
     def get_session(self, session_id: str) -> Optional[SessionRecord]:
         """Get session by ID.
@@ -295,64 +391,69 @@ class DatabaseManager:
         """
         with self._get_connection() as conn:
             row = conn.execute(
-                "SELECT * FROM sessions WHERE session_id = ?",
+                f"SELECT {_SESSION_COLUMNS} FROM sessions WHERE session_id = ?",
                 (session_id,)
             ).fetchone()
             
-            if row:
-                metadata = json.loads(row['metadata']) if row['metadata'] else None
-                return SessionRecord(
-                    session_id=row['session_id'],
-                    user_id=row['user_id'],
-                    character_id=row['character_id'],
-                    assistant_id=row['assistant_id'],
-                    thread_id=row['thread_id'],
-                    created_at=datetime.fromisoformat(row['created_at']),
-                    updated_at=datetime.fromisoformat(row['updated_at']),
-                    last_activity=datetime.fromisoformat(row['last_activity']),
-                    is_active=bool(row['is_active']),
-                    metadata=metadata
-                )
-            return None
+            return self._row_to_session(row) if row else None
     
-    def get_user_sessions(self, user_id: int, active_only: bool = True) -> List[SessionRecord]:
+    def iter_user_sessions(
+        self,
+        user_id: int,
+        active_only: bool = True,
+        limit: Optional[int] = None
+    ) -> Iterator[SessionRecord]:
+        """Iterate over a user's sessions, most recently active first.
+        
+        Rows are fetched in small batches, so callers that stop early
+        never build records for the remaining sessions.
+        
+        Args:
+            user_id: Telegram user ID
+            active_only: Only return active sessions
+            limit: Maximum number of sessions to return
+            
+        Yields:
+            Session records
+        """
+        query = f"SELECT {_SESSION_COLUMNS} FROM sessions WHERE user_id = ?"
+        params: List[Any] = [user_id]
+        
+        if active_only:
+            query += " AND is_active = 1"
+        
+        query += " ORDER BY last_activity DESC"
+        
+        if limit is not None:
+            query += " LIMIT ?"
+            params.append(limit)
+        
+        with self._get_connection() as conn:
+            cursor = conn.execute(query, params)
+            while True:
+                rows = cursor.fetchmany(SESSION_FETCH_SIZE)
+                if not rows:
+                    break
+                for row in rows:
+                    yield self._row_to_session(row)
+    
+    def get_user_sessions(
+        self,
+        user_id: int,
+        active_only: bool = True,
+        limit: Optional[int] = None
+    ) -> List[SessionRecord]:
         """Get all sessions for a user.
         
         Args:
             user_id: Telegram user ID
             active_only: Only return active sessions
+            limit: Maximum number of sessions to return
             
         Returns:
             List of session records
         """
-        with self._get_connection() as conn:
-            query = "SELECT * FROM sessions WHERE user_id = ?"
-            params = [user_id]
-            
-            if active_only:
-                query += " AND is_active = 1"
-            
-            query += " ORDER BY last_activity DESC"
-            
-            rows = conn.execute(query, params).fetchall()
-            
-            sessions = []
-            for row in rows:
-                metadata = json.loads(row['metadata']) if row['metadata'] else None
-                sessions.append(SessionRecord(
-                    session_id=row['session_id'],
-                    user_id=row['user_id'],
-                    character_id=row['character_id'],
-                    assistant_id=row['assistant_id'],
-                    thread_id=row['thread_id'],
-                    created_at=datetime.fromisoformat(row['created_at']),
-                    updated_at=datetime.fromisoformat(row['updated_at']),
-                    last_activity=datetime.fromisoformat(row['last_activity']),
-                    is_active=bool(row['is_active']),
-                    metadata=metadata
-                ))
-            
-            return sessions
+        return list(self.iter_user_sessions(user_id, active_only, limit))
     
     def deactivate_user_sessions(self, user_id: int) -> None:
         """Deactivate all sessions for a user.
@@ -378,7 +479,7 @@ class DatabaseManager:
             Number of sessions cleaned up
         """
         cutoff_date = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
-        cutoff_date = cutoff_date.replace(day=cutoff_date.day - days)
+        cutoff_date -= timedelta(days=days)
         
         with self._get_connection() as conn:
             cursor = conn.execute(
@@ -393,6 +494,53 @@ class DatabaseManager:
             
             return deleted_count
     
+    def append_message(self, conversation_id: str, message: Message) -> None:
+        """Append a message to a stored conversation.
+        
+        Args:
+            conversation_id: Conversation identifier
+            message: Message to store after the conversation's last one
+        """
+        with self._get_connection() as conn:
+            conn.execute("""
+                INSERT INTO messages (conversation_id, seq, message_id, role, content, ts, metadata)
+                SELECT ?, COALESCE(MAX(seq) + 1, 0), ?, ?, ?, ?, ?
+                FROM messages WHERE conversation_id = ?
+            """, (
+                conversation_id, message.id, _ROLE_VALUE[message.role], message.content,
+                message.timestamp, _dump_metadata(message.metadata), conversation_id
+            ))
+            conn.commit()
+    
+    def get_conversation_messages(self, conversation_id: str, limit: int = 10) -> List[Message]:
+        """Get the most recent messages of a stored conversation.
+        
+        Args:
+            conversation_id: Conversation identifier
+            limit: Maximum number of messages to return
+            
+        Returns:
+            Messages in conversation order, oldest first
+        """
+        with self._get_connection() as conn:
+            rows = conn.execute("""
+                SELECT message_id, role, content, ts, metadata FROM messages
+                WHERE conversation_id = ?
+                ORDER BY seq DESC
+                LIMIT ?
+            """, (conversation_id, limit)).fetchall()
+        
+        return [
+            Message(
+                id=row['message_id'],
+                role=_ROLE_MAP[row['role']],
+                content=row['content'],
+                timestamp=row['ts'],
+                metadata=orjson.loads(row['metadata']) if row['metadata'] else None
+            )
+            for row in reversed(rows)
+        ]
+    
     def get_stats(self) -> Dict[str, Any]:
         """Get database statistics.
         
@@ -402,13 +550,16 @@ class DatabaseManager:
         with self._get_connection() as conn:
             stats = {}
             
-            # User stats
-            stats['total_users'] = conn.execute("SELECT COUNT(*) FROM users").fetchone()[0]
-            stats['active_users'] = conn.execute("SELECT COUNT(*) FROM users WHERE is_active = 1").fetchone()[0]
-            
-            # Session stats
-            stats['total_sessions'] = conn.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
-            stats['active_sessions'] = conn.execute("SELECT COUNT(*) FROM sessions WHERE is_active = 1").fetchone()[0]
+            # User and session counts in one statement
+            row = conn.execute("""
+                SELECT
+                    (SELECT COUNT(*) FROM users),
+                    (SELECT COUNT(*) FROM users WHERE is_active = 1),
+                    (SELECT COUNT(*) FROM sessions),
+                    (SELECT COUNT(*) FROM sessions WHERE is_active = 1)
+            """).fetchone()
+            stats['total_users'], stats['active_users'] = row[0], row[1]
+            stats['total_sessions'], stats['active_sessions'] = row[2], row[3]
             
             # Character usage stats
             character_stats = conn.execute("""
@@ -1,12 +1,15 @@
 """User and session models."""
 
 from dataclasses import dataclass, field
-from datetime import datetime
+from datetime import datetime, timezone
 from typing import Optional, Dict, Any
-import uuid
+import time
 
+from ._compat import _DATACLASS_SLOTS
+from .conversation import _new_id
 
-@dataclass
+
+@dataclass(**_DATACLASS_SLOTS)
 class User:
     """User model for Telegram users."""
     
@@ -57,24 +60,29 @@ class User:
         )
 
 
-@dataclass
+@dataclass(**_DATACLASS_SLOTS)
 class UserSession:
     """User session model for managing conversation state."""
     
-    id: str = field(default_factory=lambda: str(uuid.uuid4()))
+    id: str = field(default_factory=_new_id)
     user_id: int = 0
     character_id: Optional[str] = None
     conversation_id: Optional[str] = None
     assistant_id: Optional[str] = None
     thread_id: Optional[str] = None
     created_at: datetime = field(default_factory=datetime.utcnow)
-    last_activity: datetime = field(default_factory=datetime.utcnow)
+    last_activity: float = field(default_factory=time.time)  # epoch seconds, refreshed per message
     is_active: bool = True
     metadata: Dict[str, Any] = field(default_factory=dict)
     
+    @property
+    def last_activity_at(self) -> datetime:
+        """Last activity as a naive UTC datetime."""
+        return datetime.utcfromtimestamp(self.last_activity)
+    
     def update_activity(self) -> None:
         """Update last activity timestamp."""
-        self.last_activity = datetime.utcnow()
+        self.last_activity = time.time()
     
     def set_character(self, character_id: str) -> None:
         """Set the active character for this session.
@@ -125,8 +133,7 @@ class UserSession:
         if not self.is_active:
             return True
         
-        time_diff = datetime.utcnow() - self.last_activity
-        return time_diff.total_seconds() > timeout_seconds
+        return time.time() - self.last_activity > timeout_seconds
     
     def to_dict(self) -> Dict[str, Any]:
         """Convert session to dictionary."""
@@ -138,7 +145,7 @@ class UserSession:
             "assistant_id": self.assistant_id,
             "thread_id": self.thread_id,
             "created_at": self.created_at.isoformat(),
-            "last_activity": self.last_activity.isoformat(),
+            "last_activity": self.last_activity_at.isoformat(),
             "is_active": self.is_active,
             "metadata": self.metadata
         }
@@ -147,14 +154,14 @@ class UserSession:
     def from_dict(cls, data: Dict[str, Any]) -> "UserSession":
         """Create session from dictionary."""
         return cls(
-            id=data.get("id", str(uuid.uuid4())),
+            id=data.get("id") or _new_id(),
             user_id=data["user_id"],
             character_id=data.get("character_id"),
             conversation_id=data.get("conversation_id"),
             assistant_id=data.get("assistant_id"),
             thread_id=data.get("thread_id"),
             created_at=datetime.fromisoformat(data["created_at"]),
-            last_activity=datetime.fromisoformat(data["last_activity"]),
+            last_activity=datetime.fromisoformat(data["last_activity"]).replace(tzinfo=timezone.utc).timestamp(),
             is_active=data.get("is_active", True),
             metadata=data.get("metadata", {})
         )
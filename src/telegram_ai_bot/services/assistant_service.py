@@ -1,30 +1,153 @@
 """OpenAI Assistant API service for conversation management."""
 
 import asyncio
-from typing import Optional, Dict, Any, List
+import hashlib
+import os
+import random
+import tempfile
+import time
+from pathlib import Path
+from typing import Optional, Dict, Any, Awaitable, Callable, List, TypeVar
+import httpx
 import openai
-from openai import OpenAI
+import orjson
+from openai import AsyncOpenAI
 
 from ..config.logging_config import get_logger
 from ..config.settings import get_settings
 from ..models.assistant import Assistant, AssistantThread
 from ..models.character import Character
+from ..utils.circuit_breaker import CircuitBreaker, CircuitOpenError
+from ..utils.rate_limiter import RateLimiter
 
 logger = get_logger(__name__)
 
+# Run status polling backs off exponentially from the base delay up to the cap,
+# sleeping a random fraction of the current delay (full jitter)
+RUN_POLL_BASE_DELAY = 0.3
+RUN_POLL_MAX_DELAY = 4.0
+
+# The first poll waits for most of the typical run time, tracked as an
+# exponentially weighted moving average of observed completion times
+RUN_LATENCY_INITIAL = 4.0
+RUN_LATENCY_SMOOTHING = 0.2
+RUN_FIRST_POLL_FACTOR = 0.7
+RUN_FIRST_POLL_MIN = 0.5  # never poll sooner, however fast recent runs were
+
+# Connection pool shared by all concurrent OpenAI requests
+HTTP_LIMITS = httpx.Limits(max_connections=200, max_keepalive_connections=100)
+HTTP_TIMEOUT = httpx.Timeout(60.0, connect=5.0)
+
+# Pause applied after a 429 that carries no usable retry-after header
+DEFAULT_RETRY_AFTER = 1.0
+
+# Transient failures worth retrying; other API errors (400, 404, ...) are final
+RETRYABLE_ERRORS = (openai.RateLimitError, openai.InternalServerError, openai.APIConnectionError)
+# Retry delays grow exponentially from the base up to the cap, with full jitter
+RETRY_BASE_DELAY = 1.0
+RETRY_MAX_DELAY = 60.0
+
+# Consecutive failed replies that stop further attempts for the reset period
+CIRCUIT_FAILURE_THRESHOLD = 10
+CIRCUIT_RESET_TIMEOUT = 30.0
+
+# Assistants used within this many seconds are trusted without a retrieve call
+ASSISTANT_VERIFY_TTL = 3600
+
+T = TypeVar("T")
+
 
 class AssistantService:
     """Service for managing OpenAI Assistants and conversations."""
     
-    def __init__(self):
-        """Initialize the Assistant service."""
+    def __init__(self, cache_file: Optional[str] = None):
+        """Initialize the Assistant service.
+        
+        Args:
+            cache_file: File persisting created assistants across restarts;
+                defaults to the ASSISTANT_CACHE_FILE setting ("" disables it)
+        """
         self.settings = get_settings()
-        self.client = OpenAI(
+        # One long-lived HTTP/2 pool: TLS sessions are reused and concurrent
+        # requests share connections instead of each opening its own
+        self._http = httpx.AsyncClient(http2=True, limits=HTTP_LIMITS, timeout=HTTP_TIMEOUT)
+        # Async client: requests run on the event loop instead of the default thread pool
+        self.client = AsyncOpenAI(
             api_key=self.settings.openai_api_key,
-            default_headers={"OpenAI-Beta": "assistants=v2"}
+            default_headers={"OpenAI-Beta": "assistants=v2"},
+            http_client=self._http,
+            max_retries=0  # retried in _call, which also honours the rate limiter
         )
-        self._assistants_cache: Dict[str, str] = {}  # character_id -> assistant_id
+        self._max_retries = self.settings.max_retries
+        if cache_file is None:
+            cache_file = self.settings.assistant_cache_file
+        self._cache_path = Path(cache_file) if cache_file else None
+        # character fingerprint -> {"assistant_id": ..., "verified_at": epoch seconds}
+        self._assistants_cache: Dict[str, Dict[str, Any]] = self._load_assistants_cache()
+        self._cache_save_lock = asyncio.Lock()  # keeps cache file writes in order
+        # Every API call goes through _call, which applies both client-side limits
+        self._semaphore = asyncio.Semaphore(self.settings.openai_max_concurrency)
+        self._rate_limiter = RateLimiter(
+            self.settings.openai_requests_per_minute,
+            self.settings.openai_tokens_per_minute
+        )
+        self._run_latency_ewma = RUN_LATENCY_INITIAL  # seconds
+        # Fails replies fast during an outage instead of waiting out every timeout
+        self._circuit = CircuitBreaker(CIRCUIT_FAILURE_THRESHOLD, CIRCUIT_RESET_TIMEOUT)
+        
+    async def close(self) -> None:
+        """Close the OpenAI client and its connection pool."""
+        await self.client.close()  # also closes self._http
+    
+    async def _call(self, method: Callable[..., Awaitable[T]], tokens: int = 0, **kwargs: Any) -> T:
+        """Call an OpenAI API method within the concurrency and rate limits.
         
+        Transient failures (429, 5xx, connection errors) are retried up to
+        MAX_RETRIES times with exponential backoff and full jitter.
+        
+        Args:
+            method: Async client method to call
+            tokens: Estimated tokens the call will consume
+            **kwargs: Arguments for the method
+            
+        Returns:
+            The method's result
+        """
+        attempt = 0
+        while True:
+            try:
+                # Wait for rate budget before taking a slot, so throttled callers don't hold one
+                await self._rate_limiter.acquire(tokens)
+                async with self._semaphore:
+                    return await method(**kwargs)
+            except RETRYABLE_ERRORS as e:
+                delay = random.uniform(0, min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** attempt))
+                if isinstance(e, openai.RateLimitError):
+                    retry_after = self._retry_after(e)
+                    # Hold back every other caller too instead of letting them hit the limit
+                    self._rate_limiter.pause(retry_after)
+                    logger.warning(f"OpenAI rate limit hit, pausing requests for {retry_after}s")
+                    delay = max(delay, retry_after)
+                
+                if attempt >= self._max_retries:
+                    raise
+                attempt += 1
+                logger.warning(
+                    f"OpenAI request failed ({type(e).__name__}), retry {attempt}/{self._max_retries} in {delay:.1f}s"
+                )
+            
+            # Sleep outside the semaphore so the slot is free for other calls
+            await asyncio.sleep(delay)
+    
+    @staticmethod
+    def _retry_after(error: openai.RateLimitError) -> float:
+        """Seconds to wait according to a 429 response's retry-after header."""
+        retry_after = error.response.headers.get("retry-after")
+        try:
+            return float(retry_after) if retry_after else DEFAULT_RETRY_AFTER
+        except ValueError:
+            return DEFAULT_RETRY_AFTER
+    
     async def get_or_create_assistant(self, character: Character) -> str:
         """Get or create an OpenAI Assistant for a character.
         
@@ -34,27 +157,88 @@ class AssistantService:
         Returns:
             Assistant ID
         """
+        key = self._assistant_cache_key(character)
+        
         # Check cache first
-        if character.id in self._assistants_cache:
-            assistant_id = self._assistants_cache[character.id]
+        entry = self._assistants_cache.get(key)
+        if entry:
+            assistant_id = entry["assistant_id"]
+            if time.time() - entry["verified_at"] < ASSISTANT_VERIFY_TTL:
+                return assistant_id
             try:
                 # Verify assistant still exists
                 await self._get_assistant(assistant_id)
+                await self._remember_assistant(key, assistant_id)
                 return assistant_id
             except Exception as e:
                 logger.warning(f"Cached assistant {assistant_id} not found: {e}")
-                del self._assistants_cache[character.id]
+                del self._assistants_cache[key]
+                await self._save_assistants_cache()
         
         # Create new assistant
         try:
             assistant = await self._create_assistant(character)
-            self._assistants_cache[character.id] = assistant.id
+            await self._remember_assistant(key, assistant.id)
             logger.info(f"Created assistant {assistant.id} for character {character.id}")
             return assistant.id
         except Exception as e:
             logger.error(f"Failed to create assistant for character {character.id}: {e}")
             raise
     
+    def _assistant_cache_key(self, character: Character) -> str:
+        """Fingerprint everything an assistant is created from.
+        
+        Editing a character's prompt or switching models yields a new key,
+        so a fresh assistant is created instead of reusing a stale one.
+        """
+        fingerprint = "|".join((
+            character.name, character.description, character.personality,
+            self.settings.openai_model
+        ))
+        return hashlib.sha256(fingerprint.encode()).hexdigest()
+    
+    async def _remember_assistant(self, key: str, assistant_id: str) -> None:
+        """Record a known-good assistant and persist the cache."""
+        self._assistants_cache[key] = {"assistant_id": assistant_id, "verified_at": time.time()}
+        await self._save_assistants_cache()
+    
+    def _load_assistants_cache(self) -> Dict[str, Dict[str, Any]]:
+        """Load persisted assistants, or start empty."""
+        if self._cache_path is None:
+            return {}
+        try:
+            return orjson.loads(self._cache_path.read_bytes())
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable assistant cache {self._cache_path}: {e}")
+            return {}
+    
+    async def _save_assistants_cache(self) -> None:
+        """Persist the assistant cache, if enabled, without blocking the event loop."""
+        if self._cache_path is None:
+            return
+        async with self._cache_save_lock:
+            # Snapshot on the loop; the file is written in a worker thread
+            data = orjson.dumps(self._assistants_cache)
+            try:
+                await asyncio.to_thread(self._write_cache_file, data)
+            except OSError as e:
+                logger.warning(f"Failed to save assistant cache {self._cache_path}: {e}")
+    
+    def _write_cache_file(self, data: bytes) -> None:
+        """Atomically replace the cache file, so a crash never leaves it half-written."""
+        path = self._cache_path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+    
     async def create_thread(self, assistant_id: str, user_id: int, character_id: str) -> str:
         """Create a new conversation thread.
         
@@ -67,7 +251,7 @@ class AssistantService:
             Thread ID
         """
         try:
-            thread = await asyncio.to_thread(
+            thread = await self._call(
                 self.client.beta.threads.create,
                 metadata={
                     "user_id": str(user_id),
@@ -98,31 +282,45 @@ class AssistantService:
             
         Returns:
             Assistant response
+            
+        Raises:
+            CircuitOpenError: If recent requests kept failing and the API is
+                being skipped for now
         """
+        if not self._circuit.allow_request():
+            raise CircuitOpenError("OpenAI requests are failing; skipping for now")
+        
+        # Shared by both requests below; the SDK only reads it
+        metadata = {"user_id": str(user_id)}
+        
         try:
             # Add user message to thread
-            await asyncio.to_thread(
+            await self._call(
                 self.client.beta.threads.messages.create,
                 thread_id=thread_id,
                 role="user",
                 content=message,
-                metadata={"user_id": str(user_id)}
+                metadata=metadata
             )
             
             # Create and wait for run completion
-            run = await asyncio.to_thread(
+            run = await self._call(
                 self.client.beta.threads.runs.create,
+                # The run reads the new message and may write a full completion
+                tokens=len(message) // 4 + self.settings.openai_max_tokens,
                 thread_id=thread_id,
                 assistant_id=assistant_id,
-                metadata={"user_id": str(user_id)}
+                metadata=metadata
             )
             
             # Wait for completion
             response = await self._wait_for_run_completion(thread_id, run.id)
+            self._circuit.record_success()
             logger.info(f"Generated response for user {user_id} in thread {thread_id}")
             return response
             
         except Exception as e:
+            self._circuit.record_failure()
             logger.error(f"Failed to send message to assistant: {e}")
             raise
     
@@ -136,7 +334,7 @@ class AssistantService:
             True if successful
         """
         try:
-            await asyncio.to_thread(
+            await self._call(
                 self.client.beta.threads.delete,
                 thread_id=thread_id
             )
@@ -155,7 +353,7 @@ class AssistantService:
         Returns:
             OpenAI Assistant object
         """
-        return await asyncio.to_thread(
+        return await self._call(
             self.client.beta.assistants.create,
             name=f"{character.name} - {character.description}",
             instructions=character.personality,
@@ -176,7 +374,7 @@ class AssistantService:
         Returns:
             OpenAI Assistant object
         """
-        return await asyncio.to_thread(
+        return await self._call(
             self.client.beta.assistants.retrieve,
             assistant_id=assistant_id
         )
@@ -192,43 +390,84 @@ class AssistantService:
         Returns:
             Assistant response text
         """
-        start_time = asyncio.get_event_loop().time()
+        # wait_for cancels the in-flight request when time runs out
+        # (asyncio.timeout would need Python 3.11)
+        try:
+            return await asyncio.wait_for(self._poll_run(thread_id, run_id), timeout)
+        except asyncio.TimeoutError:
+            await self._cancel_run(thread_id, run_id)
+            raise TimeoutError(f"Run {run_id} timed out after {timeout} seconds") from None
+    
+    async def _poll_run(self, thread_id: str, run_id: str) -> str:
+        """Poll a run until it finishes and return the response.
         
-        while True:
-            # Check timeout
-            if asyncio.get_event_loop().time() - start_time > timeout:
-                raise TimeoutError(f"Run {run_id} timed out after {timeout} seconds")
+        Args:
+            thread_id: Thread ID
+            run_id: Run ID
             
+        Returns:
+            Assistant response text
+        """
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        attempt = 0
+        
+        # Runs rarely finish sooner than usual, so skip the polls that would find them in progress
+        await asyncio.sleep(max(RUN_FIRST_POLL_MIN, self._run_latency_ewma * RUN_FIRST_POLL_FACTOR))
+        
+        while True:
             # Get run status
-            run = await asyncio.to_thread(
+            run = await self._call(
                 self.client.beta.threads.runs.retrieve,
                 thread_id=thread_id,
                 run_id=run_id
             )
             
             if run.status == "completed":
+                self._run_latency_ewma += RUN_LATENCY_SMOOTHING * (
+                    loop.time() - started - self._run_latency_ewma
+                )
+                
                 # Get the latest assistant message
-                messages = await asyncio.to_thread(
+                messages = await self._call(
                     self.client.beta.threads.messages.list,
                     thread_id=thread_id,
                     limit=1
                 )
                 
-                if messages.data:
-                    message = messages.data[0]
-                    if message.role == "assistant" and message.content:
-                        # Extract text content
-                        for content in message.content:
-                            if content.type == "text":
-                                return content.text.value
+                message = messages.data[0] if messages.data else None
+                if message is not None and message.role == "assistant":
+                    # First text part of the reply
+                    text = next((c.text.value for c in message.content if c.type == "text"), None)
+                    if text is not None:
+                        return text
                 
                 raise ValueError("No assistant response found")
             
             elif run.status in ["failed", "cancelled", "expired"]:
                 raise RuntimeError(f"Run {run_id} failed with status: {run.status}")
             
-            # Wait before checking again
-            await asyncio.sleep(1)
+            # Wait before checking again, backing off while the run is in progress
+            delay = min(RUN_POLL_MAX_DELAY, RUN_POLL_BASE_DELAY * 2 ** attempt)
+            attempt += 1
+            await asyncio.sleep(random.uniform(0, delay))
+    
+    async def _cancel_run(self, thread_id: str, run_id: str) -> None:
+        """Cancel a run that is no longer awaited so it stops consuming tokens.
+        
+        Args:
+            thread_id: Thread ID
+            run_id: Run ID
+        """
+        try:
+            await self._call(
+                self.client.beta.threads.runs.cancel,
+                thread_id=thread_id,
+                run_id=run_id
+            )
+            logger.info(f"Cancelled timed out run {run_id}")
+        except Exception as e:
+            logger.warning(f"Failed to cancel run {run_id}: {e}")
     
     async def list_assistants(self) -> List[Dict[str, Any]]:
         """List all assistants created by this bot.
@@ -237,7 +476,7 @@ class AssistantService:
             List of assistant information
         """
         try:
-            assistants = await asyncio.to_thread(
+            assistants = await self._call(
                 self.client.beta.assistants.list,
                 limit=100
             )
@@ -257,6 +496,26 @@ class AssistantService:
             logger.error(f"Failed to list assistants: {e}")
             return []
     
+    async def _delete_assistant(self, assistant_id: str) -> bool:
+        """Delete an assistant, logging rather than raising on failure.
+        
+        Args:
+            assistant_id: Assistant ID
+            
+        Returns:
+            True if the assistant was deleted
+        """
+        try:
+            await self._call(
+                self.client.beta.assistants.delete,
+                assistant_id=assistant_id
+            )
+            logger.info(f"Deleted assistant {assistant_id}")
+            return True
+        except Exception as e:
+            logger.warning(f"Failed to delete assistant {assistant_id}: {e}")
+            return False
+    
     async def cleanup_assistants(self) -> int:
         """Clean up unused assistants.
         
@@ -265,21 +524,16 @@ class AssistantService:
         """
         try:
             assistants = await self.list_assistants()
-            deleted_count = 0
             
-            for assistant_info in assistants:
-                try:
-                    await asyncio.to_thread(
-                        self.client.beta.assistants.delete,
-                        assistant_id=assistant_info["id"]
-                    )
-                    deleted_count += 1
-                    logger.info(f"Deleted assistant {assistant_info['id']}")
-                except Exception as e:
-                    logger.warning(f"Failed to delete assistant {assistant_info['id']}: {e}")
+            # Deletions run concurrently, bounded by the client-side limits in _call
+            results = await asyncio.gather(
+                *(self._delete_assistant(assistant_info["id"]) for assistant_info in assistants)
+            )
+            deleted_count = sum(results)
             
             # Clear cache
             self._assistants_cache.clear()
+            await self._save_assistants_cache()
             
             return deleted_count
         except Exception as e:
@@ -1,13 +1,23 @@
 """Character management service."""
 
-from typing import Optional, List, Dict
+import asyncio
+from typing import Optional, List, Dict, Mapping, Set, Tuple, Union
 from pathlib import Path
 
 from ..config.logging_config import get_logger
 from ..models.character import Character, CharacterRepository
+from ..utils.helpers import escape_markdown
 
 logger = get_logger(__name__)
 
+# MarkdownV2 message shown after a character is selected
+CHARACTER_SELECTED_TEMPLATE = (
+    "✅ *Character Selected: {emoji} {name}*\n\n"
+    "{description}\n\n"
+    "💬 {greeting}\n\n"
+    "You can now start chatting\\! I'll respond as {name}\\."
+)
+
 
 class CharacterService:
     """Service for managing characters."""
@@ -19,7 +29,28 @@ class CharacterService:
             characters_file: Path to characters configuration file
         """
         self.repository = CharacterRepository(characters_file)
-        logger.info(f"Initialized character service with {len(self.repository.get_all_characters())} characters")
+        # Read-only live view of characters, for direct lookups on hot paths
+        self.characters: Mapping[str, Character] = self.repository.characters
+        self._selection_messages: Dict[str, str] = {}  # character_id -> rendered message
+        # (repository version, selection entries) for the character menu
+        self._selection_cache: Optional[Tuple[int, List[Dict[str, str]]]] = None
+        self._photo_file_ids: Dict[str, str] = {}  # image path -> Telegram file_id
+        self._photo_bytes: Dict[str, bytes] = {}  # image path -> contents, until uploaded
+        # (repository version, {(character_id, image_index): existing image path})
+        self._image_paths: Tuple[int, Dict[Tuple[str, int], str]] = (self.repository.version, {})
+        # (repository version, image paths found on disk); missing paths are
+        # re-checked so images added later get picked up
+        self._existing_images: Tuple[int, Set[str]] = (self.repository.version, set())
+        logger.info(f"Initialized character service with {len(self.characters)} characters")
+    
+    @property
+    def version(self) -> int:
+        """Version token that changes whenever the character set changes.
+        
+        Callers caching data derived from characters can compare against it
+        to detect when the cache needs to be rebuilt.
+        """
+        return self.repository.version
     
     def get_character(self, character_id: str) -> Optional[Character]:
         """Get a character by ID.
@@ -30,7 +61,7 @@ class CharacterService:
         Returns:
             Character instance or None if not found
         """
-        return self.repository.get_character(character_id)
+        return self.characters.get(character_id)
     
     def get_all_characters(self) -> List[Character]:
         """Get all available characters.
@@ -51,11 +82,17 @@ class CharacterService:
     def get_characters_for_selection(self) -> List[Dict[str, str]]:
         """Get characters formatted for selection menu.
         
+        The list is built once per repository version and shared between
+        callers, so it must not be modified.
+        
         Returns:
             List of character selection data
         """
-        characters = self.get_all_characters()
-        return [
+        version = self.repository.version
+        if self._selection_cache and self._selection_cache[0] == version:
+            return self._selection_cache[1]
+        
+        selection = [
             {
                 "id": char.id,
                 "name": char.name,
@@ -63,8 +100,32 @@ class CharacterService:
                 "description": char.description,
                 "display_name": f"{char.emoji} {char.name}"
             }
-            for char in characters
+            for char in self.repository.all_characters
         ]
+        self._selection_cache = (version, selection)
+        return selection
+    
+    def get_selection_message(self, character: Character) -> str:
+        """Get the MarkdownV2 confirmation message for a selected character.
+        
+        Messages are rendered and escaped once per character and cached.
+        
+        Args:
+            character: Selected character
+            
+        Returns:
+            Message text ready to send with MarkdownV2 parse mode
+        """
+        message = self._selection_messages.get(character.id)
+        if message is None:
+            message = CHARACTER_SELECTED_TEMPLATE.format(
+                emoji=escape_markdown(character.emoji),
+                name=escape_markdown(character.name),
+                description=escape_markdown(character.description),
+                greeting=escape_markdown(character.greeting)
+            )
+            self._selection_messages[character.id] = message
+        return message
     
     def get_character_image_path(self, character_id: str, image_index: int = 0) -> Optional[str]:
         """Get a character image path.
@@ -76,20 +137,125 @@ class CharacterService:
         Returns:
             Image path or None if not found
         """
+        version, image_paths = self._image_paths
+        if version != self.repository.version:
+            image_paths = {}
+            self._image_paths = (self.repository.version, image_paths)
+        
+        key = (character_id, image_index)
+        cached = image_paths.get(key)
+        if cached:
+            return cached
+        
         character = self.get_character(character_id)
         if not character or not character.image_paths:
             return None
         
         if 0 <= image_index < len(character.image_paths):
             image_path = character.image_paths[image_index]
-            # Check if file exists
+            # Check if file exists; only found paths are cached so new files get picked up
             if Path(image_path).exists():
+                image_paths[key] = image_path
                 return image_path
             
             logger.warning(f"Image file not found: {image_path}")
         
         return None
     
+    async def get_photo(self, image_path: str) -> Union[str, bytes]:
+        """Get a photo ready to pass to Telegram's send/reply photo methods.
+        
+        Photos that were already uploaded are sent by their Telegram file_id;
+        otherwise the image is read from disk in a worker thread, once, and
+        kept in memory until Telegram returns a file_id for it.
+        
+        Args:
+            image_path: Path to the image file
+            
+        Returns:
+            Cached Telegram file_id or raw image bytes
+        """
+        file_id = self._photo_file_ids.get(image_path)
+        if file_id:
+            return file_id
+        
+        data = self._photo_bytes.get(image_path)
+        if data is None:
+            data = await asyncio.to_thread(Path(image_path).read_bytes)
+            self._photo_bytes[image_path] = data
+        return data
+    
+    def remember_photo(self, image_path: str, message) -> None:
+        """Cache the Telegram file_id of an uploaded photo.
+        
+        Args:
+            image_path: Path of the image that was sent
+            message: Telegram message returned by the photo send
+        """
+        if message and message.photo:
+            self._photo_file_ids[image_path] = message.photo[-1].file_id
+            self._photo_bytes.pop(image_path, None)
+    
+    def forget_photo(self, image_path: str) -> None:
+        """Drop a cached file_id, e.g. after Telegram rejected it.
+        
+        Args:
+            image_path: Path of the image
+        """
+        self._photo_file_ids.pop(image_path, None)
+    
+    async def send_photo(self, message, character: Character, caption: str) -> bool:
+        """Reply to a Telegram message with a photo of a character.
+        
+        Uses the cached file_id or image bytes from `get_photo` and records
+        the file_id Telegram returns for the next send.
+        
+        Args:
+            message: Telegram message to reply to
+            character: Character whose photo to send
+            caption: Photo caption
+            
+        Returns:
+            True if the photo was sent, False if the character has no image
+            
+        Raises:
+            Exception: If reading or sending the photo fails
+        """
+        image_path = self.get_character_image_path(character.id)
+        if not image_path:
+            return False
+        
+        try:
+            photo = await self.get_photo(image_path)
+            sent = await message.reply_photo(photo=photo, caption=caption)
+        except Exception:
+            self.forget_photo(image_path)
+            raise
+        
+        self.remember_photo(image_path, sent)
+        return True
+    
+    def _image_exists(self, image_path: str) -> bool:
+        """Check whether an image file exists, remembering files that do.
+        
+        Args:
+            image_path: Image path to check
+            
+        Returns:
+            True if the file exists
+        """
+        version, existing = self._existing_images
+        if version != self.repository.version:
+            existing = set()
+            self._existing_images = (self.repository.version, existing)
+        
+        if image_path in existing:
+            return True
+        if Path(image_path).exists():
+            existing.add(image_path)
+            return True
+        return False
+    
     def validate_character_images(self) -> Dict[str, List[str]]:
         """Validate that all character images exist.
         
@@ -98,10 +264,10 @@ class CharacterService:
         """
         missing_images = {}
         
-        for character in self.get_all_characters():
+        for character in self.repository.all_characters:
             missing = []
             for image_path in character.image_paths:
-                if not Path(image_path).exists():
+                if not self._image_exists(image_path):
                     missing.append(image_path)
             
             if missing:
@@ -109,6 +275,16 @@ class CharacterService:
         
         return missing_images
     
+    async def validate_character_images_async(self) -> Dict[str, List[str]]:
+        """Validate character images without blocking the event loop.
+        
+        Uncached existence checks run in a worker thread.
+        
+        Returns:
+            Dictionary of character_id -> list of missing image paths
+        """
+        return await asyncio.to_thread(self.validate_character_images)
+    
     def add_character(self, character: Character) -> bool:
         """Add a new character.
         
@@ -120,6 +296,7 @@ class CharacterService:
         """
         try:
             self.repository.add_character(character)
+            self._selection_messages.pop(character.id, None)
             logger.info(f"Added character {character.id} ({character.name})")
             return True
         except Exception as e:
@@ -154,6 +331,7 @@ class CharacterService:
         """
         try:
             self.repository.load_from_file(file_path)
+            self._selection_messages.clear()
             logger.info(f"Reloaded characters from {file_path}")
             return True
         except Exception as e:
@@ -1,16 +1,25 @@
 """Conversation management service."""
 
-from typing import Optional, Dict, Any
+import asyncio
+import heapq
+import time
+import weakref
+from typing import Optional, Dict, Any, List, Tuple
 from datetime import datetime
 
 from ..config.logging_config import get_logger
+from ..config.settings import get_settings
 from ..models.conversation import Conversation, Message, MessageRole
 from ..models.user import UserSession
 from ..models.character import Character
 from ..services.assistant_service import AssistantService
+from ..utils.circuit_breaker import CircuitOpenError
 
 logger = get_logger(__name__)
 
+# Reply sent straight away while OpenAI requests are being skipped
+SERVICE_BUSY_TEXT = "⏳ I'm a little overwhelmed right now. Please try again in a minute!"
+
 
 class ConversationService:
     """Service for managing conversations and user sessions."""
@@ -22,8 +31,30 @@ class ConversationService:
             assistant_service: Assistant service instance
         """
         self.assistant_service = assistant_service
+        # Messages kept in memory per conversation
+        self._max_messages = get_settings().max_conversation_history
         self._sessions: Dict[int, UserSession] = {}  # user_id -> session
+        # (last_activity, user_id, session_id) min-heap with one entry per session.
+        # Activity only moves forward, so entries are refreshed lazily during cleanup.
+        self._expiry_heap: List[Tuple[float, int, str]] = []
         self._conversations: Dict[str, Conversation] = {}  # conversation_id -> conversation
+        self._active_count = 0  # sessions in _sessions with is_active set
+        # Serializes each user's requests; a lock lives only while something holds it
+        self._user_locks: "weakref.WeakValueDictionary[int, asyncio.Lock]" = weakref.WeakValueDictionary()
+    
+    def _user_lock(self, user_id: int) -> asyncio.Lock:
+        """Get the lock serializing operations for a user.
+        
+        Args:
+            user_id: Telegram user ID
+            
+        Returns:
+            The user's lock
+        """
+        lock = self._user_locks.get(user_id)
+        if lock is None:
+            lock = self._user_locks[user_id] = asyncio.Lock()
+        return lock
     
     async def get_or_create_session(self, user_id: int) -> UserSession:
         """Get or create a user session.
@@ -34,14 +65,16 @@ class ConversationService:
         Returns:
             User session
         """
-        if user_id in self._sessions:
-            session = self._sessions[user_id]
+        session = self._sessions.get(user_id)
+        if session is not None:
             session.update_activity()
             return session
         
         # Create new session
         session = UserSession(user_id=user_id)
         self._sessions[user_id] = session
+        heapq.heappush(self._expiry_heap, (session.last_activity, user_id, session.id))
+        self._active_count += 1
         logger.info(f"Created new session for user {user_id}")
         return session
     
@@ -55,11 +88,16 @@ class ConversationService:
         Returns:
             Updated user session
         """
+        async with self._user_lock(user_id):
+            return await self._set_character(user_id, character)
+    
+    async def _set_character(self, user_id: int, character: Character) -> UserSession:
+        """Set the active character; the caller holds the user's lock."""
         session = await self.get_or_create_session(user_id)
         
         # If changing character, reset the conversation
         if session.character_id != character.id:
-            await self.reset_conversation(user_id)
+            await self._reset_conversation(user_id)
             
             # Get or create assistant for character
             assistant_id = await self.assistant_service.get_or_create_assistant(character)
@@ -80,7 +118,8 @@ class ConversationService:
                 user_id=user_id,
                 character_id=character.id,
                 assistant_id=assistant_id,
-                thread_id=thread_id
+                thread_id=thread_id,
+                max_messages=self._max_messages
             )
             self._conversations[conversation.id] = conversation
             session.set_conversation(conversation.id)
@@ -89,17 +128,35 @@ class ConversationService:
         
         return session
     
-    async def send_message(self, user_id: int, message_text: str) -> Optional[str]:
+    async def send_message(
+        self,
+        user_id: int,
+        message_text: str,
+        session: Optional[UserSession] = None
+    ) -> Optional[str]:
         """Send a message and get response.
         
         Args:
             user_id: Telegram user ID
             message_text: User message text
+            session: User session, if the caller already fetched it
             
         Returns:
             Assistant response or None if no character selected
         """
-        session = await self.get_or_create_session(user_id)
+        # One run at a time per thread: a second message waits for the first reply
+        async with self._user_lock(user_id):
+            return await self._send_message(user_id, message_text, session)
+    
+    async def _send_message(
+        self,
+        user_id: int,
+        message_text: str,
+        session: Optional[UserSession]
+    ) -> Optional[str]:
+        """Send a message and get response; the caller holds the user's lock."""
+        if session is None:
+            session = await self.get_or_create_session(user_id)
         
         if not session.character_id or not session.assistant_id or not session.thread_id:
             logger.warning(f"User {user_id} has no active character/assistant")
@@ -132,6 +189,9 @@ class ConversationService:
             logger.info(f"Processed message for user {user_id}, response length: {len(response)}")
             return response
             
+        except CircuitOpenError:
+            logger.warning(f"OpenAI unavailable, sent busy reply to user {user_id}")
+            return SERVICE_BUSY_TEXT
         except Exception as e:
             logger.error(f"Failed to process message for user {user_id}: {e}")
             return None
@@ -145,6 +205,11 @@ class ConversationService:
         Returns:
             True if successful
         """
+        async with self._user_lock(user_id):
+            return await self._reset_conversation(user_id)
+    
+    async def _reset_conversation(self, user_id: int) -> bool:
+        """Reset the conversation; the caller holds the user's lock."""
         session = await self.get_or_create_session(user_id)
         
         try:
@@ -202,6 +267,25 @@ class ConversationService:
         
         return limited_conversation
     
+    def get_recent_messages(self, user_id: int, limit: int = 10) -> List[Message]:
+        """Get a user's recent messages without copying the conversation.
+        
+        Prefer this over `get_conversation_history` when only the messages
+        are needed.
+        
+        Args:
+            user_id: Telegram user ID
+            limit: Maximum number of messages to return
+            
+        Returns:
+            Recent messages, oldest first (empty if there is no conversation)
+        """
+        session = self._sessions.get(user_id)
+        conversation = session and self._conversations.get(session.conversation_id)
+        if not conversation:
+            return []
+        return conversation.get_recent_messages(limit)
+    
     def get_session_info(self, user_id: int) -> Optional[Dict[str, Any]]:
         """Get session information for a user.
         
@@ -211,10 +295,10 @@ class ConversationService:
         Returns:
             Session information dictionary or None
         """
-        if user_id not in self._sessions:
+        session = self._sessions.get(user_id)
+        if session is None:
             return None
         
-        session = self._sessions[user_id]
         conversation = self._conversations.get(session.conversation_id)
         
         return {
@@ -224,7 +308,7 @@ class ConversationService:
             "assistant_id": session.assistant_id,
             "thread_id": session.thread_id,
             "created_at": session.created_at.isoformat(),
-            "last_activity": session.last_activity.isoformat(),
+            "last_activity": session.last_activity_at.isoformat(),
             "is_active": session.is_active,
             "message_count": len(conversation.messages) if conversation else 0
         }
@@ -238,23 +322,31 @@ class ConversationService:
         Returns:
             Number of sessions cleaned up
         """
-        expired_users = []
-        
-        for user_id, session in self._sessions.items():
-            if session.is_expired(timeout_seconds):
-                expired_users.append(user_id)
-        
+        # Only sessions whose last recorded activity is older than the timeout
+        # are looked at; active ones are re-queued at their current activity
+        heap = self._expiry_heap
+        cutoff = time.time() - timeout_seconds
         cleaned_count = 0
-        for user_id in expired_users:
+        
+        while heap and heap[0][0] < cutoff:
+            _, user_id, session_id = heapq.heappop(heap)
+            session = self._sessions.get(user_id)
+            if session is None or session.id != session_id:
+                continue  # session already removed or replaced
+            
+            if not session.is_expired(timeout_seconds):
+                heapq.heappush(heap, (session.last_activity, user_id, session_id))
+                continue
+            
             try:
-                session = self._sessions[user_id]
-                
                 # Remove conversation
                 if session.conversation_id and session.conversation_id in self._conversations:
                     del self._conversations[session.conversation_id]
                 
                 # Remove session
                 del self._sessions[user_id]
+                if session.is_active:
+                    self._active_count -= 1
                 cleaned_count += 1
                 
                 logger.info(f"Cleaned up expired session for user {user_id}")
@@ -270,7 +362,7 @@ class ConversationService:
         Returns:
             Number of active sessions
         """
-        return len([s for s in self._sessions.values() if s.is_active])
+        return self._active_count
     
     def get_total_conversations_count(self) -> int:
         """Get the total number of conversations.
@@ -15,6 +15,8 @@ class UserService:
     def __init__(self):
         """Initialize the user service."""
         self._users: Dict[int, User] = {}  # telegram_id -> user
+        # language_code -> {telegram_id: user}, kept in step with _users
+        self._by_language: Dict[Optional[str], Dict[int, User]] = {}
     
     def get_or_create_user(
         self,
@@ -36,8 +38,8 @@ class UserService:
         Returns:
             User instance
         """
-        if telegram_id in self._users:
-            user = self._users[telegram_id]
+        user = self._users.get(telegram_id)
+        if user is not None:
             # Update user information if provided
             updated = False
             if username and user.username != username:
@@ -50,7 +52,9 @@ class UserService:
                 user.last_name = last_name
                 updated = True
             if language_code and user.language_code != language_code:
+                self._unindex_language(user)
                 user.language_code = language_code
+                self._index_language(user)
                 updated = True
             
             if updated:
@@ -68,9 +72,22 @@ class UserService:
             language_code=language_code
         )
         self._users[telegram_id] = user
+        self._index_language(user)
         logger.info(f"Created new user {telegram_id} ({user.full_name})")
         return user
     
+    def _index_language(self, user: User) -> None:
+        """Add a user to the language index."""
+        self._by_language.setdefault(user.language_code, {})[user.telegram_id] = user
+    
+    def _unindex_language(self, user: User) -> None:
+        """Remove a user from the language index."""
+        users = self._by_language.get(user.language_code)
+        if users is not None:
+            users.pop(user.telegram_id, None)
+            if not users:
+                del self._by_language[user.language_code]
+    
     def get_user(self, telegram_id: int) -> Optional[User]:
         """Get a user by Telegram ID.
         
@@ -126,10 +143,7 @@ class UserService:
         Returns:
             List of users with the specified language
         """
-        return [
-            user for user in self._users.values()
-            if user.language_code == language_code
-        ]
+        return list(self._by_language.get(language_code, {}).values())
     
     def delete_user(self, telegram_id: int) -> bool:
         """Delete a user.
@@ -140,8 +154,9 @@ class UserService:
         Returns:
             True if user was deleted
         """
-        if telegram_id in self._users:
-            del self._users[telegram_id]
+        user = self._users.pop(telegram_id, None)
+        if user is not None:
+            self._unindex_language(user)
             logger.info(f"Deleted user {telegram_id}")
             return True
         return False
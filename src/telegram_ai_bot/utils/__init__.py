@@ -2,12 +2,17 @@
 
 from .helpers import format_timestamp, sanitize_text, truncate_text
 from .validators import validate_telegram_id, validate_character_id
+from .rate_limiter import RateLimiter
+from .circuit_breaker import CircuitBreaker, CircuitOpenError
 
 __all__ = [
     "format_timestamp",
     "sanitize_text", 
     "truncate_text",
     "validate_telegram_id",
-    "validate_character_id"
+    "validate_character_id",
+    "RateLimiter",
+    "CircuitBreaker",
+    "CircuitOpenError"
 ]
 
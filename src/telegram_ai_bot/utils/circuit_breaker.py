@@ -0,0 +1,63 @@
+"""Circuit breaker for failing fast while a dependency is down."""
+
+import time
+from typing import Optional
+
+
+class CircuitOpenError(Exception):
+    """Raised when a call is refused because the circuit is open."""
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker.
+
+    Closed: calls go through. After `failure_threshold` consecutive
+    failures it opens and refuses calls for `reset_timeout` seconds. It then
+    lets a single trial call through (half-open): success closes the
+    circuit, failure keeps it open for another `reset_timeout`.
+    """
+
+    def __init__(self, failure_threshold: int = 10, reset_timeout: float = 30.0):
+        """Initialize the circuit breaker.
+
+        Args:
+            failure_threshold: Consecutive failures that open the circuit
+            reset_timeout: Seconds to refuse calls before a trial call
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+
+    @property
+    def is_open(self) -> bool:
+        """Whether calls are currently being refused."""
+        return (
+            self._opened_at is not None
+            and time.monotonic() - self._opened_at < self.reset_timeout
+        )
+
+    def allow_request(self) -> bool:
+        """Check whether a call may proceed.
+
+        Returns:
+            True if the call may proceed
+        """
+        if self._opened_at is None:
+            return True
+        if self.is_open:
+            return False
+        # Half-open: let this call through and refuse others until it reports back
+        self._opened_at = time.monotonic()
+        return True
+
+    def record_success(self) -> None:
+        """Record a successful call, closing the circuit."""
+        self._failures = 0
+        self._opened_at = None
+
+    def record_failure(self) -> None:
+        """Record a failed call, opening the circuit at the threshold."""
+        self._failures += 1
+        if self._failures >= self.failure_threshold:
+            self._opened_at = time.monotonic()
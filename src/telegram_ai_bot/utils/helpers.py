@@ -3,9 +3,25 @@
 import re
 from datetime import datetime
 from typing import Optional
+from urllib.parse import urlsplit
 
 
-def format_timestamp(timestamp: datetime, format_str: str = "%Y-%m-%d %H:%M:%S") -> str:
+_DEFAULT_TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+_MENTION_RE = re.compile(r'@(\w+)')
+
+# Characters allowed in a domain label, and in a top-level domain
+_LABEL_CHARS = frozenset('abcdefghijklmnopqrstuvwxyz0123456789-')
+_TLD_CHARS = frozenset('abcdefghijklmnopqrstuvwxyz')
+
+# C0 and C1 control characters, removed by sanitize_text
+_CTRL_DELETE = dict.fromkeys([*range(0x00, 0x20), *range(0x7f, 0xa0)])
+
+# Markdown special characters, each escaped with a backslash
+_MD_ESCAPE = str.maketrans({c: '\\' + c for c in '_*[]()~`>#+-=|{}.!'})
+
+
+def format_timestamp(timestamp: datetime, format_str: str = _DEFAULT_TIMESTAMP_FORMAT) -> str:
     """Format a timestamp to string.
     
     Args:
@@ -15,6 +31,10 @@ def format_timestamp(timestamp: datetime, format_str: str = "%Y-%m-%d %H:%M:%S")
     Returns:
         Formatted timestamp string
     """
+    if format_str == _DEFAULT_TIMESTAMP_FORMAT:
+        # Formatting the fields directly skips strftime's format parsing
+        t = timestamp
+        return f"{t.year:04d}-{t.month:02d}-{t.day:02d} {t.hour:02d}:{t.minute:02d}:{t.second:02d}"
     return timestamp.strftime(format_str)
 
 
@@ -29,7 +49,7 @@ def sanitize_text(text: str, max_length: Optional[int] = None) -> str:
         Sanitized text
     """
     # Remove control characters
-    sanitized = re.sub(r'[\x00-\x1f\x7f-\x9f]', '', text)
+    sanitized = text.translate(_CTRL_DELETE)
     
     # Strip whitespace
     sanitized = sanitized.strip()
@@ -67,12 +87,7 @@ def escape_markdown(text: str) -> str:
     Returns:
         Escaped text
     """
-    special_chars = ['_', '*', '[', ']', '(', ')', '~', '`', '>', '#', '+', '-', '=', '|', '{', '}', '.', '!']
-    
-    for char in special_chars:
-        text = text.replace(char, f'\\{char}')
-    
-    return text
+    return text.translate(_MD_ESCAPE)
 
 
 def extract_user_mention(text: str) -> Optional[str]:
@@ -84,8 +99,43 @@ def extract_user_mention(text: str) -> Optional[str]:
     Returns:
         Username without @ or None if not found
     """
-    match = re.search(r'@(\w+)', text)
-    return match.group(1) if match else None
+    # Most messages have no mention; find() avoids starting the regex engine
+    start = text.find('@')
+    while start >= 0:
+        match = _MENTION_RE.match(text, start)
+        if match:
+            return match.group(1)
+        start = text.find('@', start + 1)
+    return None
+
+
+def _is_valid_host(host: str) -> bool:
+    """Check a lowercase URL host: a dotted domain, an IPv4 address or localhost."""
+    if host == 'localhost':
+        return True
+    
+    labels = host.split('.')
+    if len(labels) == 4 and all(0 < len(label) <= 3 and label.isdigit() for label in labels):
+        return True
+    
+    # A trailing dot marks a fully qualified domain name
+    if labels[-1] == '':
+        labels.pop()
+    if len(labels) < 2:
+        return False
+    
+    *domain, tld = labels
+    return (
+        2 <= len(tld) <= 6
+        and _TLD_CHARS.issuperset(tld)
+        and all(
+            0 < len(label) <= 63
+            and _LABEL_CHARS.issuperset(label)
+            and label[0] != '-'
+            and label[-1] != '-'
+            for label in domain
+        )
+    )
 
 
 def is_valid_url(url: str) -> bool:
@@ -97,13 +147,29 @@ def is_valid_url(url: str) -> bool:
     Returns:
         True if valid URL
     """
-    url_pattern = re.compile(
-        r'^https?://'  # http:// or https://
-        r'(?:(?:[A-Z0-9](?:[A-Z0-9-]{0,61}[A-Z0-9])?\.)+[A-Z]{2,6}\.?|'  # domain...
-        r'localhost|'  # localhost...
-        r'\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3})'  # ...or ip
-        r'(?::\d+)?'  # optional port
-        r'(?:/?|[/?]\S+)$', re.IGNORECASE)
-    
-    return url_pattern.match(url) is not None
+    if any(c.isspace() for c in url):
+        return False
+    
+    try:
+        parts = urlsplit(url)
+    except ValueError:
+        return False
+    
+    if parts.scheme not in ('http', 'https'):
+        return False
+    
+    # Only a path or a non-empty query may follow the host
+    rest = url[len(parts.scheme) + 3 + len(parts.netloc):]
+    if not url[len(parts.scheme):].startswith('://') or rest[:1] not in ('', '/', '?'):
+        return False
+    if rest == '?':
+        return False
+    
+    # No user info; the port, if any, is all digits
+    host, sep, port = parts.netloc.partition(':')
+    if '@' in parts.netloc or (sep and not port.isdigit()):
+        return False
+    
+    return _is_valid_host(host.lower())
+
 
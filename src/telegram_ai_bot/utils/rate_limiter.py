@@ -0,0 +1,83 @@
+"""Client-side rate limiting for outbound API calls."""
+
+import asyncio
+import time
+
+
+class RateLimiter:
+    """Token-bucket limiter for requests and tokens per minute.
+
+    Both buckets start full and refill continuously, so short bursts are
+    allowed up to the per-minute budget and sustained load is spread out.
+    A limit of 0 disables that bucket.
+    """
+
+    def __init__(self, requests_per_minute: int, tokens_per_minute: int = 0):
+        """Initialize the rate limiter.
+
+        Args:
+            requests_per_minute: Maximum requests per minute (0 for no limit)
+            tokens_per_minute: Maximum tokens per minute (0 for no limit)
+        """
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self._requests = float(requests_per_minute)
+        self._tokens = float(tokens_per_minute)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = asyncio.Lock()  # waiters are served in order
+
+    def _refill(self, now: float) -> None:
+        """Top up both buckets for the time elapsed since the last refill."""
+        elapsed = now - self._updated
+        self._updated = now
+        self._requests = min(
+            self.requests_per_minute,
+            self._requests + elapsed * self.requests_per_minute / 60
+        )
+        self._tokens = min(
+            self.tokens_per_minute,
+            self._tokens + elapsed * self.tokens_per_minute / 60
+        )
+
+    @staticmethod
+    def _wait_time(available: float, needed: float, per_minute: int) -> float:
+        """Seconds until a bucket holds `needed` units (0 if it already does)."""
+        if not per_minute or available >= needed:
+            return 0.0
+        return (needed - available) * 60 / per_minute
+
+    async def acquire(self, tokens: int = 0) -> None:
+        """Wait until a request using `tokens` tokens may be sent.
+
+        Args:
+            tokens: Estimated tokens the request will consume
+        """
+        # A request larger than the whole budget only waits for a full bucket
+        tokens = min(tokens, self.tokens_per_minute)
+
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._refill(now)
+
+                wait = max(
+                    self._paused_until - now,
+                    self._wait_time(self._requests, 1, self.requests_per_minute),
+                    self._wait_time(self._tokens, tokens, self.tokens_per_minute)
+                )
+                if wait <= 0:
+                    break
+                await asyncio.sleep(wait)
+
+            if self.requests_per_minute:
+                self._requests -= 1
+            self._tokens -= tokens
+
+    def pause(self, seconds: float) -> None:
+        """Hold back all requests for a while, e.g. after a `retry-after` response.
+
+        Args:
+            seconds: Seconds to wait before the next request
+        """
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
@@ -1,7 +1,28 @@
 """Validation utility functions."""
 
-import re
-from typing import Any
+import string
+from typing import Any, Set
+
+try:
+    # Linear-time matching on untrusted input when google-re2 is installed
+    import re2 as _re
+except ImportError:
+    import re as _re
+
+
+_LOWER = frozenset(string.ascii_lowercase)
+_LETTERS = frozenset(string.ascii_letters)
+# Character IDs should be lowercase alphanumeric with underscores
+_CHAR_ID_CHARS = _LOWER | frozenset(string.digits + '_')
+# Telegram usernames: alphanumeric + underscore
+_USERNAME_CHARS = _LETTERS | frozenset(string.digits + '_')
+
+# Validator patterns, compiled once at import time. They are used with
+# fullmatch and ASCII classes so re and re2 accept exactly the same strings.
+# OpenAI API keys start with 'sk-' and are followed by alphanumeric characters
+_OPENAI_KEY_RE = _re.compile(r'sk-[a-zA-Z0-9]{48,}')
+# Telegram bot tokens: bot_id:auth_token (numbers:alphanumeric)
+_TG_TOKEN_RE = _re.compile(r'[0-9]+:[a-zA-Z0-9_-]{35}')
 
 
 def validate_telegram_id(telegram_id: Any) -> bool:
@@ -13,11 +34,8 @@ def validate_telegram_id(telegram_id: Any) -> bool:
     Returns:
         True if valid Telegram ID
     """
-    if not isinstance(telegram_id, int):
-        return False
-    
-    # Telegram user IDs are positive integers
-    return telegram_id > 0
+    # Telegram user IDs are positive integers (bools and other int subclasses excluded)
+    return type(telegram_id) is int and telegram_id > 0
 
 
 def validate_character_id(character_id: Any) -> bool:
@@ -32,9 +50,11 @@ def validate_character_id(character_id: Any) -> bool:
     if not isinstance(character_id, str):
         return False
     
-    # Character IDs should be lowercase alphanumeric with underscores
-    pattern = r'^[a-z][a-z0-9_]*$'
-    return bool(re.match(pattern, character_id)) and len(character_id) <= 50
+    return (
+        0 < len(character_id) <= 50
+        and character_id[0] in _LOWER
+        and _CHAR_ID_CHARS.issuperset(character_id)
+    )
 
 
 def validate_message_content(content: Any) -> bool:
@@ -50,7 +70,13 @@ def validate_message_content(content: Any) -> bool:
         return False
     
     # Message should not be empty and not too long
-    return 0 < len(content.strip()) <= 4000
+    if not content:
+        return False
+    
+    # Only pay for a stripped copy when there is whitespace to strip
+    if content[0].isspace() or content[-1].isspace():
+        return 0 < len(content.strip()) <= 4000
+    return len(content) <= 4000
 
 
 def validate_username(username: Any) -> bool:
@@ -65,14 +91,13 @@ def validate_username(username: Any) -> bool:
     if not isinstance(username, str):
         return False
     
-    # Telegram usernames: 5-32 chars, alphanumeric + underscore, no consecutive underscores
-    pattern = r'^[a-zA-Z][a-zA-Z0-9_]{4,31}$'
-    
-    if not re.match(pattern, username):
-        return False
-    
-    # Check for consecutive underscores
-    return '__' not in username
+    # Telegram usernames: 5-32 chars starting with a letter, no consecutive underscores
+    return (
+        5 <= len(username) <= 32
+        and username[0] in _LETTERS
+        and _USERNAME_CHARS.issuperset(username)
+        and '__' not in username
+    )
 
 
 def validate_language_code(language_code: Any) -> bool:
@@ -88,8 +113,15 @@ def validate_language_code(language_code: Any) -> bool:
         return False
     
     # ISO 639-1 language codes (2 letters) or with country code (2-2 letters)
-    pattern = r'^[a-z]{2}(-[a-z]{2})?$'
-    return bool(re.match(pattern, language_code.lower()))
+    code = language_code.lower()
+    if len(code) == 5:
+        if code[2] != '-':
+            return False
+        code = code[:2] + code[3:]
+    elif len(code) != 2:
+        return False
+    
+    return code.isascii() and code.isalpha()
 
 
 def validate_openai_api_key(api_key: Any) -> bool:
@@ -104,9 +136,7 @@ def validate_openai_api_key(api_key: Any) -> bool:
     if not isinstance(api_key, str):
         return False
     
-    # OpenAI API keys start with 'sk-' and are followed by alphanumeric characters
-    pattern = r'^sk-[a-zA-Z0-9]{48,}$'
-    return bool(re.match(pattern, api_key))
+    return bool(_OPENAI_KEY_RE.fullmatch(api_key))
 
 
 def validate_telegram_token(token: Any) -> bool:
@@ -121,7 +151,32 @@ def validate_telegram_token(token: Any) -> bool:
     if not isinstance(token, str):
         return False
     
-    # Telegram bot tokens: bot_id:auth_token (numbers:alphanumeric)
-    pattern = r'^\d+:[a-zA-Z0-9_-]{35}$'
-    return bool(re.match(pattern, token))
+    return bool(_TG_TOKEN_RE.fullmatch(token))
+
+
+_FORMAT_VALIDATORS = {
+    'character_id': validate_character_id,
+    'username': validate_username,
+    'language_code': validate_language_code,
+    'openai_api_key': validate_openai_api_key,
+    'telegram_token': validate_telegram_token,
+}
 
+
+def classify(value: Any) -> Set[str]:
+    """Find every string format a value is valid for.
+    
+    Meant for bulk validation of unknown strings, in place of calling each
+    format validator separately.
+    
+    Args:
+        value: Value to classify
+        
+    Returns:
+        Names of the matching formats: character_id, username,
+        language_code, openai_api_key and/or telegram_token
+    """
+    if not isinstance(value, str):
+        return set()
+    
+    return {name for name, validator in _FORMAT_VALIDATORS.items() if validator(value)}
@@ -5,10 +5,6 @@ Test script to verify OpenAI Assistant API v2 is working.
 
 import asyncio
 import sys
-from pathlib import Path
-
-# Add src to path
-sys.path.insert(0, str(Path(__file__).parent / "src"))
 
 from telegram_ai_bot.services.assistant_service import AssistantService
 from telegram_ai_bot.services.character_service import CharacterService
@@ -2,13 +2,8 @@
 
 import pytest
 import asyncio
+import heapq
 from unittest.mock import Mock, AsyncMock
-from pathlib import Path
-import sys
-
-# Add src to Python path
-src_path = Path(__file__).parent.parent / "src"
-sys.path.insert(0, str(src_path))
 
 from telegram_ai_bot.config.settings import Settings
 from telegram_ai_bot.models.character import Character
@@ -45,19 +40,29 @@ def mock_settings(monkeypatch):
 
 
 @pytest.fixture
-def sample_character():
+def character_factory():
+    """Factory for characters; keyword arguments override the test defaults."""
+    def _make(**overrides):
+        fields = dict(
+            id="test_char",
+            name="Test Character",
+            emoji="🤖",
+            description="A test character for unit tests",
+            personality="You are a helpful test character.",
+            greeting="Hello! I'm a test character.",
+            image_paths=["test/image1.jpg", "test/image2.jpg"],
+            traits=["helpful", "friendly", "test"],
+            conversation_style="helpful and friendly"
+        )
+        fields.update(overrides)
+        return Character(**fields)
+    return _make
+
+
+@pytest.fixture
+def sample_character(character_factory):
     """Sample character for testing."""
-    return Character(
-        id="test_char",
-        name="Test Character",
-        emoji="🤖",
-        description="A test character for unit tests",
-        personality="You are a helpful test character.",
-        greeting="Hello! I'm a test character.",
-        image_paths=["test/image1.jpg", "test/image2.jpg"],
-        traits=["helpful", "friendly", "test"],
-        conversation_style="helpful and friendly"
-    )
+    return character_factory()
 
 
 @pytest.fixture
@@ -124,31 +129,95 @@ def mock_openai_client():
 
 
 @pytest.fixture
-def assistant_service(mock_openai_client, monkeypatch):
+def assistant_service(mock_openai_client, monkeypatch, tmp_path):
     """Assistant service with mocked OpenAI client."""
-    service = AssistantService()
+    service = AssistantService(cache_file=str(tmp_path / "assistants.json"))
     monkeypatch.setattr(service, "client", mock_openai_client)
+    # Mocked runs complete immediately, so skip the first-poll wait
+    service._run_latency_ewma = 0.0
+    monkeypatch.setattr("telegram_ai_bot.services.assistant_service.RUN_FIRST_POLL_MIN", 0.0)
     return service
 
 
+@pytest.fixture(scope="session")
+def character_service_ro():
+    """Character service shared by tests that only read from it."""
+    return CharacterService()
+
+
 @pytest.fixture
 def character_service():
     """Character service for testing."""
     return CharacterService()
 
 
+@pytest.fixture
+def path_exists(monkeypatch):
+    """Set the result of Path.exists; checked paths are recorded in `.checked`."""
+    checked = []
+    
+    def _set(value):
+        def _exists(self):
+            checked.append(str(self))
+            return value
+        monkeypatch.setattr("pathlib.Path.exists", _exists)
+    
+    _set.checked = checked
+    return _set
+
+
 @pytest.fixture
 def user_service():
     """User service for testing."""
     return UserService()
 
 
+@pytest.fixture
+def user_factory(user_service):
+    """Factory that gets or creates users in the test user service."""
+    def _make(**kwargs):
+        kwargs.setdefault("telegram_id", 123456789)
+        return user_service.get_or_create_user(**kwargs)
+    return _make
+
+
+@pytest.fixture
+def two_users(user_factory):
+    """An English-speaking and a Spanish-speaking user."""
+    return (
+        user_factory(telegram_id=123456789, language_code="en"),
+        user_factory(telegram_id=987654321, language_code="es"),
+    )
+
+
 @pytest.fixture
 def conversation_service(assistant_service):
     """Conversation service for testing."""
     return ConversationService(assistant_service)
 
 
+@pytest.fixture
+def expired_session_factory(conversation_service):
+    """Factory for sessions last active `age` seconds ago (two hours by default)."""
+    async def _make(user_id, age=7200):
+        session = await conversation_service.get_or_create_session(user_id)
+        # Move the queued expiry entry along with the session's last activity
+        heap = conversation_service._expiry_heap
+        heap.remove((session.last_activity, session.user_id, session.id))
+        session.last_activity -= age
+        heap.append((session.last_activity, session.user_id, session.id))
+        heapq.heapify(heap)
+        return session
+    return _make
+
+
+@pytest.fixture
+def primed_session(event_loop, conversation_service, sample_character):
+    """Conversation service with sample_character selected for user 123456789."""
+    event_loop.run_until_complete(conversation_service.set_character(123456789, sample_character))
+    return conversation_service
+
+
 @pytest.fixture
 def mock_telegram_update():
     """Mock Telegram update for testing."""
@@ -60,6 +60,17 @@ class TestCommandHandler:
         
         # Should reply with status
         mock_telegram_update.message.reply_text.assert_called_once()
+    
+    def test_character_keyboard_cached(self, command_handler, character_service, character_factory):
+        """Test character keyboard is reused until characters change."""
+        keyboard = command_handler._get_character_keyboard()
+        assert command_handler._get_character_keyboard() is keyboard
+        
+        character_service.add_character(character_factory(id="new_char", name="New", image_paths=[]))
+        
+        rebuilt = command_handler._get_character_keyboard()
+        assert rebuilt is not keyboard
+        assert len(rebuilt.inline_keyboard) == len(keyboard.inline_keyboard) + 1
 
 
 class TestMessageHandler:
@@ -102,6 +113,7 @@ class TestMessageHandler:
         assert message_handler._is_photo_request("send me a photo")
         assert message_handler._is_photo_request("show me your picture")
         assert message_handler._is_photo_request("what do you look like")
+        assert message_handler._is_photo_request("Send Me A SELFIE")
         assert not message_handler._is_photo_request("hello there")
     
     @pytest.mark.asyncio
@@ -114,10 +126,11 @@ class TestMessageHandler:
     ):
         """Test handling photo request."""
         # Set up character
+        message_handler.character_service.add_character(sample_character)
         await message_handler.conversation_service.set_character(123456789, sample_character)
         
         # Mock image file existence
-        with patch('builtins.open', mock=Mock()):
+        with patch.object(message_handler.character_service, 'get_photo', AsyncMock(return_value=b"image")):
             with patch('pathlib.Path.exists', return_value=True):
                 await message_handler._handle_photo_request(mock_telegram_update, mock_telegram_context)
         
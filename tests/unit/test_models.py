@@ -1,10 +1,16 @@
 """Tests for data models."""
 
 import pytest
-from datetime import datetime
+import threading
+from dataclasses import replace
+from datetime import datetime, timedelta
 from telegram_ai_bot.models.character import Character, CharacterRepository
 from telegram_ai_bot.models.conversation import Conversation, Message, MessageRole
 from telegram_ai_bot.models.user import User, UserSession
+from telegram_ai_bot.models.assistant import AssistantThread
+from telegram_ai_bot.models.database import (
+    SESSION_FETCH_SIZE, DatabaseManager, SessionRecord, UserRecord
+)
 
 
 class TestCharacter:
@@ -30,6 +36,7 @@ class TestCharacter:
         new_character = Character.from_dict(data)
         assert new_character.id == sample_character.id
         assert new_character.name == sample_character.name
+        assert new_character.traits == tuple(sample_character.traits)
 
 
 class TestCharacterRepository:
@@ -56,6 +63,36 @@ class TestCharacterRepository:
         retrieved = repo.get_character("test_char")
         assert retrieved is not None
         assert retrieved.name == "Test Character"
+    
+    def test_characters_view(self, sample_character):
+        """Test read-only characters view tracks additions."""
+        repo = CharacterRepository()
+        view = repo.characters
+        version = repo.version
+        
+        snapshot = repo.all_characters
+        assert repo.all_characters is snapshot  # reused until characters change
+        
+        repo.add_character(sample_character)
+        assert view["test_char"] is sample_character
+        assert repo.version != version
+        assert repo.all_characters[-1] is sample_character
+        
+        with pytest.raises(TypeError):
+            view["other"] = sample_character
+    
+    def test_save_and_load_file(self, sample_character, tmp_path):
+        """Test characters round-trip through a JSON file."""
+        file_path = str(tmp_path / "characters.json")
+        repo = CharacterRepository()
+        repo.add_character(sample_character)
+        repo.save_to_file(file_path)
+        
+        loaded = CharacterRepository(file_path)
+        character = loaded.get_character("test_char")
+        assert character is not None
+        assert character.image_paths == ("test/image1.jpg", "test/image2.jpg")
+        assert len(loaded.get_all_characters()) == len(repo.get_all_characters())
 
 
 class TestMessage:
@@ -69,7 +106,7 @@ class TestMessage:
         )
         assert message.role == MessageRole.USER
         assert message.content == "Test message"
-        assert isinstance(message.timestamp, datetime)
+        assert isinstance(message.timestamp, int)
     
     def test_message_to_openai_format(self):
         """Test message OpenAI format conversion."""
@@ -91,6 +128,13 @@ class TestMessage:
         new_message = Message.from_dict(data)
         assert new_message.role == message.role
         assert new_message.content == message.content
+        assert abs(new_message.timestamp - message.timestamp) < 1000  # microsecond precision
+        assert isinstance(datetime.fromisoformat(data["timestamp"]), datetime)
+        
+        # Metadata is only allocated when present
+        assert message.metadata is None
+        assert data["metadata"] == {}
+        assert new_message.metadata is None
 
 
 class TestConversation:
@@ -130,6 +174,47 @@ class TestConversation:
         recent = conversation.get_recent_messages(3)
         assert len(recent) == 3
         assert recent[-1].content == "Message 4"  # Most recent
+        assert conversation.get_recent_messages(0) == []
+    
+    def test_message_history_bounded(self):
+        """Test only the most recent messages are kept in memory."""
+        conversation = Conversation(user_id=123456789, max_messages=3)
+        for i in range(5):
+            conversation.add_user_message(f"Message {i}")
+        
+        assert [m.content for m in conversation.messages] == ["Message 2", "Message 3", "Message 4"]
+        assert [m.content for m in conversation.get_recent_messages(10)] == ["Message 2", "Message 3", "Message 4"]
+    
+    def test_get_openai_messages(self):
+        """Test OpenAI message list includes the character system prompt."""
+        conversation = Conversation(user_id=123456789, character_id="riley")
+        conversation.add_user_message("Hello")
+        
+        messages = conversation.get_openai_messages()
+        assert messages[0]["role"] == "system"
+        assert messages[0]["content"].startswith("You are Riley")
+        assert messages[1] == {"role": "user", "content": "Hello"}
+        
+        # System message is built once per character
+        assert conversation.get_openai_messages()[0] is messages[0]
+    
+    def test_system_message_follows_character_changes(self, sample_character):
+        """Test cached system messages are rebuilt when characters change."""
+        Conversation.clear_system_cache()
+        conversation = Conversation(user_id=123456789, character_id=sample_character.id)
+        assert conversation.get_openai_messages() == []
+        
+        Conversation._SYSTEM_REPOSITORY.add_character(sample_character)
+        messages = conversation.get_openai_messages()
+        assert messages[0] == {"role": "system", "content": sample_character.personality}
+        
+        Conversation._SYSTEM_REPOSITORY.add_character(
+            replace(sample_character, personality="You are someone else.")
+        )
+        assert conversation.get_openai_messages()[0]["content"] == "You are someone else."
+        
+        Conversation.clear_system_cache()
+        assert conversation.get_openai_messages() == []
     
     def test_clear_messages(self):
         """Test clearing messages."""
@@ -139,6 +224,34 @@ class TestConversation:
         
         conversation.clear_messages()
         assert len(conversation.messages) == 0
+    
+    def test_conversation_serialization(self):
+        """Test conversation round-trip keeps message dicts identical."""
+        conversation = Conversation(user_id=123456789, character_id="riley")
+        conversation.add_user_message("Hello", {"source": "test"})
+        conversation.add_assistant_message("Hi there!")
+        
+        data = conversation.to_dict()
+        assert data["messages"] == [msg.to_dict() for msg in conversation.messages]
+        
+        restored = Conversation.from_dict(data)
+        assert restored.to_dict() == data
+    
+    def test_conversation_serialization_keeps_long_history(self):
+        """Test a conversation is unbounded by default and round-trips in full."""
+        conversation = Conversation(user_id=123456789)
+        for i in range(60):
+            conversation.add_user_message(f"Message {i}")
+        
+        restored = Conversation.from_dict(conversation.to_dict())
+        assert len(restored.messages) == 60
+        assert restored.to_dict() == conversation.to_dict()
+        
+        # A bound is round-tripped too
+        bounded = Conversation.from_dict({**conversation.to_dict(), "max_messages": 20})
+        assert bounded.max_messages == 20
+        assert [m.content for m in bounded.messages][0] == "Message 40"
+        assert Conversation.from_dict(bounded.to_dict()).messages.maxlen == 20
 
 
 class TestUser:
@@ -193,10 +306,21 @@ class TestUserSession:
         # Fresh session should not be expired
         assert not session.is_expired(timeout_seconds=3600)
         
+        # Idle session should be expired
+        session.last_activity -= 7200
+        assert session.is_expired(timeout_seconds=3600)
+        
         # Inactive session should be expired
+        session.update_activity()
         session.is_active = False
         assert session.is_expired(timeout_seconds=3600)
     
+    def test_session_round_trip(self):
+        """Test session serialization keeps last activity."""
+        session = UserSession(user_id=123456789)
+        restored = UserSession.from_dict(session.to_dict())
+        assert restored.last_activity_at == session.last_activity_at
+    
     def test_session_reset(self):
         """Test session reset."""
         session = UserSession(user_id=123456789)
@@ -207,3 +331,178 @@ class TestUserSession:
         assert session.character_id is None
         assert session.conversation_id is None
 
+
+class TestAssistantThread:
+    """Tests for AssistantThread model."""
+    
+    def test_thread_round_trip(self):
+        """Test thread serialization keeps the stored timestamp."""
+        thread = AssistantThread(id="thread_1", assistant_id="asst_1", user_id=123456789)
+        restored = AssistantThread.from_dict(thread.to_dict())
+        assert restored.created_at == thread.created_at
+    
+    def test_thread_from_dict_without_timestamp(self):
+        """Test missing created_at defaults to the current time."""
+        thread = AssistantThread.from_dict({"id": "thread_1", "assistant_id": "asst_1", "user_id": 1})
+        assert isinstance(thread.created_at, datetime)
+
+
+class TestDatabaseManager:
+    """Tests for DatabaseManager."""
+    
+    def test_create_or_update_user_sets_created_at(self, tmp_path):
+        """Test saved users come back with their stored creation time."""
+        db = DatabaseManager(str(tmp_path / "bot.db"))
+        placeholder = datetime(2000, 1, 1)
+        
+        created = db.create_or_update_user(UserRecord(
+            123456789, "testuser", "Test", None, "en", placeholder, placeholder
+        ))
+        assert created.created_at != placeholder
+        assert created.created_at == db.get_user(123456789).created_at
+        
+        # Updates keep the original creation time
+        updated = db.create_or_update_user(UserRecord(
+            123456789, "renamed", "Test", None, "en", placeholder, placeholder
+        ))
+        assert updated.created_at == created.created_at
+        assert db.get_user(123456789).username == "renamed"
+    
+    def test_create_or_update_session_sets_created_at(self, tmp_path):
+        """Test saved sessions come back with their stored creation time."""
+        db = DatabaseManager(str(tmp_path / "bot.db"))
+        placeholder = datetime(2000, 1, 1)
+        
+        created = db.create_or_update_session(SessionRecord(
+            "session_1", 123456789, "test_char", None, None,
+            placeholder, placeholder, placeholder
+        ))
+        assert created.created_at != placeholder
+        assert created.created_at == db.get_session("session_1").created_at
+        
+        # Updates keep the original creation time
+        updated = db.create_or_update_session(SessionRecord(
+            "session_1", 123456789, "other_char", None, None,
+            placeholder, placeholder, placeholder
+        ))
+        assert updated.created_at == created.created_at
+        assert db.get_session("session_1").character_id == "other_char"
+    
+    def test_append_message_numbers_each_conversation(self, tmp_path):
+        """Test message sequence numbers count up per conversation."""
+        db = DatabaseManager(str(tmp_path / "bot.db"))
+        for content in ("first", "second", "third"):
+            db.append_message("conv_a", Message(role=MessageRole.USER, content=content))
+        db.append_message("conv_b", Message(role=MessageRole.ASSISTANT, content="other"))
+        
+        with db._get_connection() as conn:
+            rows = conn.execute(
+                "SELECT conversation_id, seq FROM messages ORDER BY conversation_id, seq"
+            ).fetchall()
+        assert [tuple(row) for row in rows] == [
+            ("conv_a", 0), ("conv_a", 1), ("conv_a", 2), ("conv_b", 0)
+        ]
+    
+    def test_get_conversation_messages_limit_and_order(self, tmp_path):
+        """Test the most recent messages are returned oldest first."""
+        db = DatabaseManager(str(tmp_path / "bot.db"))
+        for i in range(5):
+            db.append_message("conv_a", Message(
+                role=MessageRole.USER, content=f"message {i}", metadata={"i": i}
+            ))
+        
+        messages = db.get_conversation_messages("conv_a", limit=3)
+        assert [m.content for m in messages] == ["message 2", "message 3", "message 4"]
+        assert messages[0].role == MessageRole.USER
+        assert messages[0].metadata == {"i": 2}
+        assert db.get_conversation_messages("missing") == []
+    
+    def test_upsert_sessions_round_trips_metadata(self, tmp_path):
+        """Test session metadata survives repeated upserts unchanged."""
+        db = DatabaseManager(str(tmp_path / "bot.db"))
+        now = datetime.now()
+        metadata = {"language": "en", "turns": 3, "tags": ["a", "b"], "nested": {"x": None}}
+        
+        db.upsert_sessions([SessionRecord(
+            "session_1", 123456789, "test_char", None, None, now, now, now, metadata={"old": 1}
+        )])
+        db.upsert_sessions([SessionRecord(
+            "session_1", 123456789, "test_char", None, None, now, now, now, metadata=metadata
+        )])
+        
+        assert db.get_session("session_1").metadata == metadata
+    
+    def test_cleanup_old_sessions_deletes_only_stale(self, tmp_path):
+        """Test only inactive sessions older than the cutoff are removed."""
+        db = DatabaseManager(str(tmp_path / "bot.db"))
+        now = datetime.now()
+        db.upsert_sessions([
+            SessionRecord(session_id, 123456789, None, None, None, now, now, now, is_active=False)
+            for session_id in ("stale", "fresh")
+        ])
+        with db._get_connection() as conn:
+            conn.execute(
+                "UPDATE sessions SET updated_at = ? WHERE session_id = 'stale'",
+                ((now - timedelta(days=45)).isoformat(),)
+            )
+            conn.commit()
+        
+        assert db.cleanup_old_sessions(days=30) == 1
+        assert db.get_session("stale") is None
+        assert db.get_session("fresh") is not None
+    
+    def test_get_stats_counts(self, tmp_path):
+        """Test statistics reflect the stored users and sessions."""
+        db = DatabaseManager(str(tmp_path / "bot.db"))
+        now = datetime.now()
+        db.create_or_update_user(UserRecord(1, "one", None, None, "en", now, now))
+        db.create_or_update_user(UserRecord(2, "two", None, None, "en", now, now, is_active=False))
+        db.upsert_sessions([
+            SessionRecord("s1", 1, "char_a", None, None, now, now, now),
+            SessionRecord("s2", 1, "char_a", None, None, now, now, now, is_active=False),
+            SessionRecord("s3", 2, "char_b", None, None, now, now, now),
+            SessionRecord("s4", 2, None, None, None, now, now, now),
+        ])
+        
+        assert db.get_stats() == {
+            'total_users': 2,
+            'active_users': 1,
+            'total_sessions': 4,
+            'active_sessions': 3,
+            'character_usage': {'char_a': 2, 'char_b': 1},
+        }
+    
+    def test_iter_user_sessions_spans_fetch_batches(self, tmp_path):
+        """Test streaming returns every session past the first batch."""
+        db = DatabaseManager(str(tmp_path / "bot.db"))
+        now = datetime.now()
+        count = SESSION_FETCH_SIZE * 2 + 5
+        db.upsert_sessions([
+            SessionRecord(f"session_{i}", 123456789, None, None, None, now, now, now)
+            for i in range(count)
+        ])
+        
+        session_ids = {record.session_id for record in db.iter_user_sessions(123456789)}
+        assert session_ids == {f"session_{i}" for i in range(count)}
+        assert len(db.get_user_sessions(123456789, limit=SESSION_FETCH_SIZE + 1)) == SESSION_FETCH_SIZE + 1
+    
+    def test_connections_are_per_thread(self, tmp_path):
+        """Test each thread gets its own connection and sees others' writes."""
+        db = DatabaseManager(str(tmp_path / "bot.db"))
+        now = datetime.now()
+        seen = {}
+        
+        def worker():
+            db.create_or_update_user(UserRecord(2, "other", None, None, "en", now, now))
+            seen['conn'] = db._local.conn
+            seen['user'] = db.get_user(1)
+            db.close()
+        
+        db.create_or_update_user(UserRecord(1, "main", None, None, "en", now, now))
+        thread = threading.Thread(target=worker)
+        thread.start()
+        thread.join()
+        
+        assert seen['conn'] is not db._local.conn
+        assert seen['user'].username == "main"
+        assert db.get_user(2).username == "other"
@@ -1,9 +1,12 @@
 """Tests for service classes."""
 
+import asyncio
+import httpx
+import openai
 import pytest
 from unittest.mock import Mock, AsyncMock, patch
 from telegram_ai_bot.services.assistant_service import AssistantService
-from telegram_ai_bot.services.conversation_service import ConversationService
+from telegram_ai_bot.services.conversation_service import ConversationService, SERVICE_BUSY_TEXT
 from telegram_ai_bot.services.character_service import CharacterService
 from telegram_ai_bot.services.user_service import UserService
 
@@ -21,6 +24,35 @@ class TestAssistantService:
         assistant_id_2 = await assistant_service.get_or_create_assistant(sample_character)
         assert assistant_id_2 == assistant_id
     
+    @pytest.mark.asyncio
+    async def test_assistant_cache_persisted(
+        self, assistant_service, mock_openai_client, sample_character, character_factory, tmp_path
+    ):
+        """Test created assistants are reused after a restart without API calls."""
+        await assistant_service.get_or_create_assistant(sample_character)
+        
+        restarted = AssistantService(cache_file=str(tmp_path / "assistants.json"))
+        restarted.client = mock_openai_client
+        assert await restarted.get_or_create_assistant(sample_character) == "asst_test123"
+        assert mock_openai_client.beta.assistants.create.await_count == 1
+        mock_openai_client.beta.assistants.retrieve.assert_not_awaited()
+        
+        # A changed prompt gets its own assistant
+        await restarted.get_or_create_assistant(character_factory(personality="Changed"))
+        assert mock_openai_client.beta.assistants.create.await_count == 2
+        
+        # Saves replace the file atomically and leave no temp files behind
+        assert not list(tmp_path.glob("*.tmp"))
+    
+    @pytest.mark.asyncio
+    async def test_assistant_cache_saved_off_event_loop(self, assistant_service, sample_character):
+        """Test the cache file is written in a worker thread."""
+        with patch("asyncio.to_thread", AsyncMock()) as to_thread:
+            await assistant_service.get_or_create_assistant(sample_character)
+        
+        to_thread.assert_awaited_once()
+        assert to_thread.await_args.args[0] == assistant_service._write_cache_file
+    
     @pytest.mark.asyncio
     async def test_create_thread(self, assistant_service):
         """Test creating a thread."""
@@ -47,6 +79,97 @@ class TestAssistantService:
         """Test deleting a thread."""
         result = await assistant_service.delete_thread("thread_test123")
         assert result is True
+    
+    @pytest.mark.asyncio
+    async def test_rate_limit_pauses_requests(self, assistant_service):
+        """Test a 429 response pauses further requests for its retry-after."""
+        request = httpx.Request("POST", "https://api.openai.com/v1/threads")
+        response = httpx.Response(429, headers={"retry-after": "2"}, request=request)
+        assistant_service.client.beta.threads.create.side_effect = openai.RateLimitError(
+            "rate limited", response=response, body=None
+        )
+        
+        assistant_service._max_retries = 0
+        
+        with patch.object(assistant_service._rate_limiter, "pause") as pause:
+            with pytest.raises(openai.RateLimitError):
+                await assistant_service.create_thread("asst_test123", 123456789, "test_char")
+        
+        pause.assert_called_once_with(2.0)
+    
+    @pytest.mark.asyncio
+    async def test_transient_errors_retried(self, assistant_service):
+        """Test server errors are retried with backoff and client errors are not."""
+        request = httpx.Request("POST", "https://api.openai.com/v1/threads")
+        create = assistant_service.client.beta.threads.create
+        create.side_effect = [
+            openai.InternalServerError("boom", response=httpx.Response(500, request=request), body=None),
+            Mock(id="thread_retry")
+        ]
+        
+        with patch("asyncio.sleep", AsyncMock()) as sleep:
+            thread_id = await assistant_service.create_thread("asst_test123", 123456789, "test_char")
+        
+        assert thread_id == "thread_retry"
+        assert create.await_count == 2
+        sleep.assert_awaited_once()
+        
+        create.side_effect = openai.BadRequestError(
+            "bad", response=httpx.Response(400, request=request), body=None
+        )
+        with pytest.raises(openai.BadRequestError):
+            await assistant_service.create_thread("asst_test123", 123456789, "test_char")
+        assert create.await_count == 3
+    
+    @pytest.mark.asyncio
+    async def test_run_timeout_cancels_run(self, assistant_service):
+        """Test a run that does not finish in time is cancelled."""
+        client = assistant_service.client
+        client.beta.threads.runs.retrieve.return_value = Mock(status="in_progress")
+        client.beta.threads.runs.cancel = AsyncMock()
+        
+        with pytest.raises(TimeoutError):
+            await assistant_service._wait_for_run_completion("thread_test123", "run_test123", timeout=0.05)
+        
+        client.beta.threads.runs.cancel.assert_awaited_once_with(
+            thread_id="thread_test123", run_id="run_test123"
+        )
+    
+    @pytest.mark.asyncio
+    async def test_first_poll_adapts_to_run_latency(self, assistant_service):
+        """Test the first poll waits for most of the typical run time, which is then updated."""
+        assistant_service._run_latency_ewma = 1.0
+        
+        with patch("asyncio.sleep", AsyncMock()) as sleep:
+            response = await assistant_service._wait_for_run_completion("thread_test123", "run_test123")
+        
+        assert response == "Test response from assistant"
+        sleep.assert_awaited_once_with(pytest.approx(0.7))
+        assert assistant_service._run_latency_ewma == pytest.approx(0.8, abs=0.05)
+    
+    @pytest.mark.asyncio
+    async def test_first_poll_has_minimum_delay(self, assistant_service, monkeypatch):
+        """Test fast recent runs never make the first poll sooner than the minimum."""
+        monkeypatch.setattr("telegram_ai_bot.services.assistant_service.RUN_FIRST_POLL_MIN", 0.5)
+        assistant_service._run_latency_ewma = 0.1
+        
+        with patch("asyncio.sleep", AsyncMock()) as sleep:
+            await assistant_service._wait_for_run_completion("thread_test123", "run_test123")
+        
+        sleep.assert_awaited_once_with(0.5)
+    
+    @pytest.mark.asyncio
+    async def test_cleanup_assistants(self, assistant_service):
+        """Test cleanup deletes all bot assistants and counts only successes."""
+        assistants = [{"id": f"asst_{i}"} for i in range(3)]
+        client = assistant_service.client
+        client.beta.assistants.delete.side_effect = [None, Exception("not found"), None]
+        
+        with patch.object(assistant_service, "list_assistants", AsyncMock(return_value=assistants)):
+            deleted = await assistant_service.cleanup_assistants()
+        
+        assert deleted == 2
+        assert client.beta.assistants.delete.await_count == 3
 
 
 class TestConversationService:
@@ -69,59 +192,127 @@ class TestConversationService:
         assert session.character_id == sample_character.id
         assert session.assistant_id is not None
         assert session.thread_id is not None
+        
+        # Conversation history is capped by MAX_CONVERSATION_HISTORY
+        conversation = conversation_service._conversations[session.conversation_id]
+        assert conversation.max_messages == conversation_service._max_messages
     
     @pytest.mark.asyncio
-    async def test_send_message(self, conversation_service, sample_character):
+    async def test_send_message(self, primed_session):
         """Test sending a message."""
-        # First set a character
-        await conversation_service.set_character(123456789, sample_character)
-        
-        # Then send a message
-        response = await conversation_service.send_message(123456789, "Hello")
+        response = await primed_session.send_message(123456789, "Hello")
         assert response == "Test response from assistant"
     
     @pytest.mark.asyncio
-    async def test_reset_conversation(self, conversation_service, sample_character):
+    async def test_send_message_serialized_per_user(self, primed_session):
+        """Test concurrent messages from one user never overlap their runs."""
+        active = []
+        overlaps = []
+        
+        async def fake_send(**kwargs):
+            overlaps.append(bool(active))
+            active.append(kwargs["message"])
+            await asyncio.sleep(0.01)
+            active.pop()
+            return "ok"
+        
+        with patch.object(primed_session.assistant_service, "send_message", side_effect=fake_send):
+            responses = await asyncio.gather(
+                primed_session.send_message(123456789, "one"),
+                primed_session.send_message(123456789, "two")
+            )
+        
+        assert responses == ["ok", "ok"]
+        assert overlaps == [False, False]
+    
+    @pytest.mark.asyncio
+    async def test_send_message_circuit_open(self, primed_session):
+        """Test a busy reply is returned without calling OpenAI while the circuit is open."""
+        assistant_service = primed_session.assistant_service
+        for _ in range(assistant_service._circuit.failure_threshold):
+            assistant_service._circuit.record_failure()
+        
+        response = await primed_session.send_message(123456789, "Hello")
+        assert response == SERVICE_BUSY_TEXT
+        assistant_service.client.beta.threads.messages.create.assert_not_awaited()
+    
+    @pytest.mark.asyncio
+    async def test_get_recent_messages(self, primed_session):
+        """Test recent messages are returned straight from the conversation."""
+        assert primed_session.get_recent_messages(123456789) == []
+        
+        await primed_session.send_message(123456789, "Hello")
+        
+        messages = primed_session.get_recent_messages(123456789, limit=1)
+        assert [m.content for m in messages] == ["Test response from assistant"]
+    
+    @pytest.mark.asyncio
+    async def test_reset_conversation(self, primed_session):
         """Test resetting a conversation."""
-        # Set character and send message
-        await conversation_service.set_character(123456789, sample_character)
-        await conversation_service.send_message(123456789, "Hello")
+        await primed_session.send_message(123456789, "Hello")
         
         # Reset conversation
-        result = await conversation_service.reset_conversation(123456789)
+        result = await primed_session.reset_conversation(123456789)
         assert result is True
     
-    def test_cleanup_expired_sessions(self, conversation_service):
+    @pytest.mark.asyncio
+    async def test_cleanup_expired_sessions(self, conversation_service, expired_session_factory):
         """Test cleaning up expired sessions."""
-        # Create a session and mark it as expired
-        session = conversation_service._sessions[123456789] = Mock()
-        session.is_expired.return_value = True
+        await expired_session_factory(123456789)
+        await conversation_service.get_or_create_session(987654321)
+        assert conversation_service.get_active_sessions_count() == 2
         
-        cleaned = conversation_service.cleanup_expired_sessions(timeout_seconds=1)
+        cleaned = conversation_service.cleanup_expired_sessions(timeout_seconds=3600)
         assert cleaned == 1
         assert 123456789 not in conversation_service._sessions
+        assert 987654321 in conversation_service._sessions
+        assert conversation_service.get_active_sessions_count() == 1
+    
+    @pytest.mark.asyncio
+    async def test_cleanup_keeps_reactivated_sessions(self, conversation_service, expired_session_factory):
+        """Test a session active since its queued time is kept and re-queued."""
+        session = await expired_session_factory(123456789)
+        session.update_activity()
+        
+        assert conversation_service.cleanup_expired_sessions(timeout_seconds=3600) == 0
+        assert 123456789 in conversation_service._sessions
+        assert conversation_service._expiry_heap == [(session.last_activity, 123456789, session.id)]
 
 
 class TestCharacterService:
     """Tests for CharacterService."""
     
-    def test_get_character(self, character_service):
+    def test_get_character(self, character_service_ro):
         """Test getting a character."""
-        character = character_service.get_character("riley")
+        character = character_service_ro.get_character("riley")
         assert character is not None
         assert character.name == "Riley"
     
-    def test_get_all_characters(self, character_service):
+    def test_get_all_characters(self, character_service_ro):
         """Test getting all characters."""
-        characters = character_service.get_all_characters()
+        characters = character_service_ro.get_all_characters()
         assert len(characters) > 0
         assert any(char.id == "riley" for char in characters)
     
-    def test_get_characters_for_selection(self, character_service):
+    def test_get_characters_for_selection(self, character_service_ro):
         """Test getting characters for selection menu."""
-        selection_data = character_service.get_characters_for_selection()
+        selection_data = character_service_ro.get_characters_for_selection()
         assert len(selection_data) > 0
         assert all("id" in char and "display_name" in char for char in selection_data)
+        
+        # Cached until the character set changes
+        assert character_service_ro.get_characters_for_selection() is selection_data
+    
+    def test_get_selection_message(self, character_service_ro):
+        """Test character selection message rendering."""
+        character = character_service_ro.get_character("riley")
+        message = character_service_ro.get_selection_message(character)
+        assert "*Character Selected: " in message
+        assert "\\n" not in message  # real newlines, not escaped ones
+        assert message.endswith("I'll respond as Riley\\.")
+        
+        # Should be served from cache on second call
+        assert character_service_ro.get_selection_message(character) is message
     
     def test_add_character(self, character_service, sample_character):
         """Test adding a character."""
@@ -132,73 +323,135 @@ class TestCharacterService:
         assert retrieved is not None
         assert retrieved.name == "Test Character"
     
-    @patch('pathlib.Path.exists')
-    def test_get_character_image_path(self, mock_exists, character_service, sample_character):
+    def test_get_character_image_path(self, path_exists, character_service, sample_character):
         """Test getting character image path."""
-        mock_exists.return_value = True
+        path_exists(True)
         character_service.add_character(sample_character)
         
         image_path = character_service.get_character_image_path("test_char", 0)
         assert image_path == "test/image1.jpg"
+        
+        # Found paths are cached until the character set changes
+        path_exists(False)
+        assert character_service.get_character_image_path("test_char", 0) == "test/image1.jpg"
+        character_service.add_character(sample_character)
+        assert character_service.get_character_image_path("test_char", 0) is None
     
-    @patch('pathlib.Path.exists')
-    def test_validate_character_images(self, mock_exists, character_service, sample_character):
+    def test_validate_character_images(self, path_exists, character_service, sample_character):
         """Test validating character images."""
-        mock_exists.return_value = False  # Simulate missing files
+        path_exists(False)  # Simulate missing files
         character_service.add_character(sample_character)
         
         missing = character_service.validate_character_images()
         assert "test_char" in missing
         assert len(missing["test_char"]) == 2  # Both images missing
+        
+        # Images added later are picked up
+        path_exists(True)
+        assert character_service.validate_character_images() == {}
+        
+        # Found images are remembered until characters change
+        calls = len(path_exists.checked)
+        assert character_service.validate_character_images() == {}
+        assert len(path_exists.checked) == calls
+        
+        # Caches are per instance
+        other = CharacterService()
+        other.add_character(sample_character)
+        other.validate_character_images()
+        assert len(path_exists.checked) > calls
+    
+    @pytest.mark.asyncio
+    async def test_validate_character_images_async(self, character_service, sample_character):
+        """Test async validation reports the same missing images."""
+        character_service.add_character(sample_character)
+        
+        missing = await character_service.validate_character_images_async()
+        assert missing == character_service.validate_character_images()
+        assert missing["test_char"] == list(sample_character.image_paths)
+    
+    @pytest.mark.asyncio
+    async def test_get_photo_uses_cached_file_id(self, character_service, tmp_path):
+        """Test photos are read from disk until Telegram returns a file_id."""
+        image_path = tmp_path / "photo.jpg"
+        image_path.write_bytes(b"jpeg-data")
+        
+        assert await character_service.get_photo(str(image_path)) == b"jpeg-data"
+        
+        # Bytes are kept in memory until the first successful upload
+        image_path.write_bytes(b"changed")
+        assert await character_service.get_photo(str(image_path)) == b"jpeg-data"
+        
+        message = Mock()
+        message.photo = [Mock(file_id="small"), Mock(file_id="large")]
+        character_service.remember_photo(str(image_path), message)
+        assert await character_service.get_photo(str(image_path)) == "large"
+        
+        character_service.forget_photo(str(image_path))
+        assert await character_service.get_photo(str(image_path)) == b"changed"
+    
+    @pytest.mark.asyncio
+    async def test_send_photo(self, character_service, sample_character, character_factory, tmp_path):
+        """Test sending a character photo as a reply."""
+        message = Mock()
+        message.reply_photo = AsyncMock(return_value=Mock(photo=[Mock(file_id="file_123")]))
+        
+        # No image on disk for the sample character
+        character_service.add_character(sample_character)
+        assert await character_service.send_photo(message, sample_character, "caption") is False
+        message.reply_photo.assert_not_called()
+        
+        image_path = tmp_path / "photo.jpg"
+        image_path.write_bytes(b"jpeg-data")
+        sample_character = character_factory(image_paths=[str(image_path)])
+        character_service.add_character(sample_character)
+        assert await character_service.send_photo(message, sample_character, "caption") is True
+        message.reply_photo.assert_called_once_with(photo=b"jpeg-data", caption="caption")
+        assert await character_service.get_photo(str(image_path)) == "file_123"
 
 
 class TestUserService:
     """Tests for UserService."""
     
-    def test_get_or_create_user(self, user_service):
+    def test_get_or_create_user(self, user_factory):
         """Test getting or creating a user."""
-        user = user_service.get_or_create_user(
-            telegram_id=123456789,
-            username="testuser",
-            first_name="Test",
-            last_name="User"
-        )
+        user = user_factory(username="testuser", first_name="Test", last_name="User")
         assert user.telegram_id == 123456789
         assert user.username == "testuser"
         
         # Should return same user on second call
-        user_2 = user_service.get_or_create_user(telegram_id=123456789)
+        user_2 = user_factory()
         assert user.telegram_id == user_2.telegram_id
     
-    def test_update_user_metadata(self, user_service):
+    def test_update_user_metadata(self, user_service, user_factory):
         """Test updating user metadata."""
-        user = user_service.get_or_create_user(telegram_id=123456789)
+        user = user_factory()
         
         result = user_service.update_user_metadata(123456789, {"test_key": "test_value"})
         assert result is True
         assert user.metadata["test_key"] == "test_value"
     
-    def test_get_user_count(self, user_service):
+    def test_get_user_count(self, user_service, two_users):
         """Test getting user count."""
-        initial_count = user_service.get_user_count()
-        
-        user_service.get_or_create_user(telegram_id=123456789)
-        user_service.get_or_create_user(telegram_id=987654321)
-        
-        assert user_service.get_user_count() == initial_count + 2
+        assert user_service.get_user_count() == len(two_users)
     
-    def test_get_users_by_language(self, user_service):
+    def test_get_users_by_language(self, user_service, user_factory, two_users):
         """Test getting users by language."""
-        user_service.get_or_create_user(telegram_id=123456789, language_code="en")
-        user_service.get_or_create_user(telegram_id=987654321, language_code="es")
-        
         en_users = user_service.get_users_by_language("en")
         assert len(en_users) == 1
         assert en_users[0].telegram_id == 123456789
+        
+        # Index follows language changes and deletions
+        user_factory(language_code="es")
+        assert user_service.get_users_by_language("en") == []
+        assert len(user_service.get_users_by_language("es")) == 2
+        
+        user_service.delete_user(987654321)
+        assert [u.telegram_id for u in user_service.get_users_by_language("es")] == [123456789]
     
-    def test_delete_user(self, user_service):
+    def test_delete_user(self, user_service, user_factory):
         """Test deleting a user."""
-        user_service.get_or_create_user(telegram_id=123456789)
+        user_factory()
         
         result = user_service.delete_user(123456789)
         assert result is True
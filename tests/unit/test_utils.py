@@ -1,5 +1,6 @@
 """Tests for utility functions."""
 
+import asyncio
 import pytest
 from datetime import datetime
 from telegram_ai_bot.utils.helpers import (
@@ -9,8 +10,19 @@ from telegram_ai_bot.utils.helpers import (
 from telegram_ai_bot.utils.validators import (
     validate_telegram_id, validate_character_id, validate_message_content,
     validate_username, validate_language_code, validate_openai_api_key,
-    validate_telegram_token
+    validate_telegram_token, classify
 )
+from telegram_ai_bot.utils.circuit_breaker import CircuitBreaker
+from telegram_ai_bot.utils.rate_limiter import RateLimiter
+
+
+# Boundary-length inputs, built once at import
+_MSG_MAX = "A" * 4000
+_MSG_OVER = "A" * 4001
+_USERNAME_MAX = "a" * 32
+_USERNAME_OVER = "a" * 33
+_OPENAI_KEY = "sk-" + "a" * 48
+_TG_TOKEN = "123456789:" + "A" * 35  # Exactly 35 characters after the bot ID
 
 
 class TestHelpers:
@@ -56,103 +68,213 @@ class TestHelpers:
         truncated = truncate_text(short_text, 20)
         assert truncated == "Short"
     
-    def test_escape_markdown(self):
-        """Test markdown escaping."""
-        text = "Hello *world* [link](url)"
-        escaped = escape_markdown(text)
-        assert "\\*" in escaped
-        assert "\\[" in escaped
-        assert "\\]" in escaped
+    @pytest.mark.parametrize("char", list("_*[]()~`>#+-=|{}.!"))
+    def test_escape_markdown(self, char):
+        """Test each markdown special character is escaped."""
+        assert escape_markdown(f"a{char}b") == f"a\\{char}b"
+    
+    def test_escape_markdown_plain_text(self):
+        """Test text without special characters is unchanged."""
+        assert escape_markdown("Hello world") == "Hello world"
     
-    def test_extract_user_mention(self):
+    @pytest.mark.parametrize("text,expected", [
+        ("Hello @username how are you?", "username"),
+        ("Hello there", None),
+        pytest.param("me @ home, ask @admin", "admin", id="lone_at_before_mention"),
+    ])
+    def test_extract_user_mention(self, text, expected):
         """Test user mention extraction."""
-        text_with_mention = "Hello @username how are you?"
-        username = extract_user_mention(text_with_mention)
-        assert username == "username"
-        
-        text_without_mention = "Hello there"
-        username = extract_user_mention(text_without_mention)
-        assert username is None
+        assert extract_user_mention(text) == expected
     
-    def test_is_valid_url(self):
+    @pytest.mark.parametrize("url,expected", [
+        ("https://example.com", True),
+        ("http://localhost:8080", True),
+        ("https://api.openai.com/v1/chat", True),
+        ("not-a-url", False),
+        ("ftp://example.com", False),
+        pytest.param("http://example", False, id="no_top_level_domain"),
+        pytest.param("http://example.com:99999", True, id="any_numeric_port"),
+        pytest.param("http://example.com:port", False, id="non_numeric_port"),
+        pytest.param("http://1.2.3.4/x", True, id="ipv4"),
+        pytest.param("http://example.com.", True, id="trailing_dot"),
+        pytest.param("http://.", False, id="empty_labels"),
+        pytest.param("http://-.-", False, id="hyphen_labels"),
+        pytest.param("http://-a.com", False, id="leading_hyphen"),
+        pytest.param("http://a-.com", False, id="trailing_hyphen"),
+        pytest.param("http://example.c0m", False, id="non_letter_tld"),
+        pytest.param("http://user:pw@evil.com", False, id="userinfo"),
+        pytest.param("http://[::1]/", False, id="ipv6"),
+        pytest.param("http://example.com#frag", False, id="fragment_after_host"),
+        pytest.param("http://example.com?", False, id="empty_query"),
+        pytest.param("http://example.com?q", True, id="query_after_host"),
+    ])
+    def test_is_valid_url(self, url, expected):
         """Test URL validation."""
-        assert is_valid_url("https://example.com")
-        assert is_valid_url("http://localhost:8080")
-        assert is_valid_url("https://api.openai.com/v1/chat")
-        assert not is_valid_url("not-a-url")
-        assert not is_valid_url("ftp://example.com")
-
+        assert is_valid_url(url) is expected
+    
+    @pytest.mark.parametrize("url", [
+        "", "http://", "http://[::1", "https://\x00.com", "//example.com",
+    ])
+    def test_is_valid_url_malformed(self, url):
+        """Test malformed URLs are rejected rather than raising."""
+        assert is_valid_url(url) is False
 
 class TestValidators:
     """Tests for validator functions."""
     
-    def test_validate_telegram_id(self):
+    @pytest.mark.parametrize("value,expected", [
+        (123456789, True),
+        (-123, False),
+        (0, False),
+        ("123456789", False),
+        (None, False),
+        (True, False),
+    ])
+    def test_validate_telegram_id(self, value, expected):
         """Test Telegram ID validation."""
-        assert validate_telegram_id(123456789)
-        assert not validate_telegram_id(-123)
-        assert not validate_telegram_id(0)
-        assert not validate_telegram_id("123456789")
-        assert not validate_telegram_id(None)
+        assert validate_telegram_id(value) is expected
     
-    def test_validate_character_id(self):
+    @pytest.mark.parametrize("value,expected", [
+        ("riley", True),
+        ("test_character", True),
+        ("char123", True),
+        pytest.param("Riley", False, id="uppercase"),
+        pytest.param("123char", False, id="starts_with_number"),
+        pytest.param("char-name", False, id="hyphen"),
+        pytest.param("", False, id="empty"),
+        pytest.param(123, False, id="not_string"),
+    ])
+    def test_validate_character_id(self, value, expected):
         """Test character ID validation."""
-        assert validate_character_id("riley")
-        assert validate_character_id("test_character")
-        assert validate_character_id("char123")
-        assert not validate_character_id("Riley")  # uppercase
-        assert not validate_character_id("123char")  # starts with number
-        assert not validate_character_id("char-name")  # hyphen not allowed
-        assert not validate_character_id("")  # empty
-        assert not validate_character_id(123)  # not string
-    
-    def test_validate_message_content(self):
+        assert validate_character_id(value) is expected
+    
+    @pytest.mark.parametrize("value,expected", [
+        ("Hello world", True),
+        pytest.param(_MSG_MAX, True, id="max_len"),
+        pytest.param("", False, id="empty"),
+        pytest.param("   ", False, id="whitespace_only"),
+        pytest.param(_MSG_OVER, False, id="over_max"),
+        pytest.param("  " + _MSG_MAX + "\n", True, id="padding_not_counted"),
+        pytest.param(123, False, id="not_string"),
+    ])
+    def test_validate_message_content(self, value, expected):
         """Test message content validation."""
-        assert validate_message_content("Hello world")
-        assert validate_message_content("A" * 4000)  # max length
-        assert not validate_message_content("")  # empty
-        assert not validate_message_content("   ")  # whitespace only
-        assert not validate_message_content("A" * 4001)  # too long
-        assert not validate_message_content(123)  # not string
-    
-    def test_validate_username(self):
+        assert validate_message_content(value) is expected
+    
+    @pytest.mark.parametrize("value,expected", [
+        ("username", True),
+        ("user_name", True),
+        ("user123", True),
+        pytest.param(_USERNAME_MAX, True, id="max_len"),
+        pytest.param("user", False, id="too_short"),
+        pytest.param("user__name", False, id="consecutive_underscores"),
+        pytest.param("123user", False, id="starts_with_number"),
+        pytest.param("user-name", False, id="hyphen"),
+        pytest.param(_USERNAME_OVER, False, id="too_long"),
+    ])
+    def test_validate_username(self, value, expected):
         """Test username validation."""
-        assert validate_username("username")
-        assert validate_username("user_name")
-        assert validate_username("user123")
-        assert validate_username("a" * 32)  # max length
-        assert not validate_username("user")  # too short
-        assert not validate_username("user__name")  # consecutive underscores
-        assert not validate_username("123user")  # starts with number
-        assert not validate_username("user-name")  # hyphen not allowed
-        assert not validate_username("a" * 33)  # too long
-    
-    def test_validate_language_code(self):
+        assert validate_username(value) is expected
+    
+    @pytest.mark.parametrize("value,expected", [
+        ("en", True),
+        ("en-us", True),
+        ("fr-ca", True),
+        pytest.param("EN", True, id="uppercase"),
+        pytest.param("english", False, id="too_long"),
+        pytest.param("en_us", False, id="underscore"),
+        pytest.param("123", False, id="numbers"),
+    ])
+    def test_validate_language_code(self, value, expected):
         """Test language code validation."""
-        assert validate_language_code("en")
-        assert validate_language_code("en-us")
-        assert validate_language_code("fr-ca")
-        assert validate_language_code("EN")  # uppercase is converted to lowercase
-        assert not validate_language_code("english")  # too long
-        assert not validate_language_code("en_us")  # underscore not allowed
-        assert not validate_language_code("123")  # numbers not allowed
-    
-    def test_validate_openai_api_key(self):
+        assert validate_language_code(value) is expected
+    
+    @pytest.mark.parametrize("value,expected", [
+        pytest.param(_OPENAI_KEY, True, id="valid"),
+        pytest.param(_OPENAI_KEY + "\n", False, id="trailing_newline"),
+        ("invalid-key", False),
+        ("sk-short", False),
+        pytest.param("ak-" + "a" * 48, False, id="wrong_prefix"),
+        pytest.param(123, False, id="not_string"),
+    ])
+    def test_validate_openai_api_key(self, value, expected):
         """Test OpenAI API key validation."""
-        valid_key = "sk-" + "a" * 48
-        assert validate_openai_api_key(valid_key)
-        
-        assert not validate_openai_api_key("invalid-key")
-        assert not validate_openai_api_key("sk-short")
-        assert not validate_openai_api_key("ak-" + "a" * 48)  # wrong prefix
-        assert not validate_openai_api_key(123)  # not string
+        assert validate_openai_api_key(value) is expected
     
-    def test_validate_telegram_token(self):
+    @pytest.mark.parametrize("value,expected", [
+        pytest.param(_TG_TOKEN, True, id="valid"),
+        pytest.param(_TG_TOKEN + "\n", False, id="trailing_newline"),
+        pytest.param("١٢٣:" + "A" * 35, False, id="non_ascii_digits"),
+        ("invalid-token", False),
+        ("123456789:short", False),
+        pytest.param("notanumber:" + "A" * 35, False, id="non_numeric_bot_id"),
+        pytest.param(123, False, id="not_string"),
+    ])
+    def test_validate_telegram_token(self, value, expected):
         """Test Telegram bot token validation."""
-        valid_token = "123456789:" + "A" * 35  # Exactly 35 characters
-        assert validate_telegram_token(valid_token)
+        assert validate_telegram_token(value) is expected
+    
+    def test_classify(self):
+        """Test classifying a value against every format."""
+        assert classify("en") == {"character_id", "language_code"}
+        assert classify("john_doe") == {"character_id", "username"}
+        assert classify(_TG_TOKEN) == {"telegram_token"}
+        assert classify("not valid!") == set()
+        assert classify(None) == set()
+
+
+class TestRateLimiter:
+    """Tests for RateLimiter."""
+    
+    @pytest.mark.asyncio
+    async def test_acquire_within_budget(self):
+        """Test requests within the budget are not delayed."""
+        limiter = RateLimiter(requests_per_minute=60, tokens_per_minute=1000)
+        for _ in range(3):
+            await limiter.acquire(tokens=100)
+        
+        assert limiter._requests == pytest.approx(57, abs=0.1)
+        assert limiter._tokens == pytest.approx(700, abs=1)
+    
+    def test_wait_time(self):
+        """Test wait time for an empty bucket."""
+        assert RateLimiter._wait_time(10, 1, 60) == 0
+        assert RateLimiter._wait_time(0, 1, 60) == pytest.approx(1.0)
+        assert RateLimiter._wait_time(0, 100, 0) == 0  # unlimited
+    
+    @pytest.mark.asyncio
+    async def test_pause(self):
+        """Test pausing delays the next request."""
+        limiter = RateLimiter(requests_per_minute=0)
+        limiter.pause(0.05)
         
-        assert not validate_telegram_token("invalid-token")
-        assert not validate_telegram_token("123456789:short")
-        assert not validate_telegram_token("notanumber:" + "A" * 35)
-        assert not validate_telegram_token(123)  # not string
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        await limiter.acquire()
+        assert loop.time() - start >= 0.04
 
+
+class TestCircuitBreaker:
+    """Tests for CircuitBreaker."""
+    
+    def test_opens_after_consecutive_failures(self):
+        """Test the circuit opens at the threshold and a success resets it."""
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+        breaker.record_failure()
+        breaker.record_success()
+        breaker.record_failure()
+        assert breaker.allow_request()
+        
+        breaker.record_failure()
+        assert breaker.is_open
+        assert not breaker.allow_request()
+    
+    def test_half_open_trial(self):
+        """Test one trial call is allowed after the reset timeout."""
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+        breaker.record_failure()
+        
+        assert breaker.allow_request()  # trial call
+        breaker.record_success()
+        assert not breaker.is_open
+        assert breaker.allow_request()